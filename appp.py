@@ -4,15 +4,24 @@
 # --------------------------------------------------------------------------- #
 from __future__ import annotations  # must be first executable line
 
-import json
+import hashlib
+import io
+import logging
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import orjson
 import pandas as pd
 import streamlit as st
 
 from config.settings import settings
-from features.pdfs.indexer import index_pdfs
 from features.llm.chat import ask_llm
+from features.llm.semcache import SemanticCache
 from openai import OpenAIError
-from features.analytics.charts import draw_pie, draw_line_chart
 from features.analytics.portfolio import (
     compute_portfolio_metrics,
     compute_portfolio_metrics_from_excel,
@@ -27,11 +36,14 @@ from features.marketdata.yahoo import (
 )
 from features.excel.loader import (
     load_excel,
+    format_dates,
     get_fund_series,
     get_fund_month_value,
-    get_fund_rankings,    
+    get_fund_rankings,
 )
 
+logger = logging.getLogger(__name__)
+
 # --------------------------------------------------------------------------- #
 # Streamlit page config                                                       #
 # --------------------------------------------------------------------------- #
@@ -39,213 +51,13 @@ st.set_page_config(
     page_title="PDF-Aware Finance Chatbot", page_icon="🤖", layout="centered"
 )
 st.title("🤖 PDF-Aware Finance Chatbot (Azure OpenAI)")
-# Inject basic styling to match company colours
-
+# Company styling lives in static/theme.css (served via Streamlit static
+# serving, see .streamlit/config.toml). Shipping a one-line <link> per
+# rerun lets the browser cache the stylesheet instead of re-parsing the
+# full inline block every interaction.
 st.markdown(
-    """
-    <style>
-    /********  GLOBAL  ********/
-    html, body, [data-testid=\"stAppViewContainer\"] {
-        background-color: #F8F9FA;
-        color: #212529;
-    }
-
-    /********  SIDEBAR  ********/
-    [data-testid=\"stSidebar\"] {
-        background-color: #F0F4F8;
-    }
-    [data-testid="stSidebar"] * {
-        color: #232D4B !important;
-    }
-
-    /********  HEADER  ********/
-    [data-testid=\"stHeader\"] {
-        background-color: #232D4B;
-    }
-    [data-testid=\"stHeader\"] * {
-        color: #FFFFFF !important;
-    }
-    header [data-testid=\"collapsedControl\"] svg,
-    header [data-testid=\"stDeployButton\"] * {
-        color: #FFFFFF !important;
-        fill: #FFFFFF !important;
-    }
-
-    /********  BUTTONS  ********/
-    div.stButton > button {
-        background-color: #E8B00F;
-        color: #212529;
-        border: 1px solid #E8B00F;
-    }
-    div.stButton > button:hover,
-    div.stButton > button:focus {
-        background-color: #D9A10D;
-        color: #212529;
-        border: 1px solid #D9A10D;
-    }
-
-    /********  FORM INPUTS  ********/
-    .stTextInput input,
-    .stNumberInput input,
-    .stDateInput input {
-        border: 1px solid #486581;
-    }
-    .stTextInput input::placeholder,
-    .stNumberInput input::placeholder {
-        color: #486581;
-        opacity: 1;
-    }
-    [data-baseweb=\"form-control-caption\"] {
-        color: #486581;
-        font-style: italic;
-    }
-
-    /********  FILE UPLOADER  ********/
-    [data-testid=\"stFileUploadDropzone\"] {
-        background-color: #F0F4F8;
-        border: 2px dashed #BCCCDC;
-        color: #486581;
-    }
-
-    /********  TABS  ********/
-    [data-testid=\"stTabs\"] [role=\"tablist\"] {
-        background-color: transparent;
-    }
-    [data-testid=\"stTabs\"] button {
-        color: #486581;
-        border-bottom: 3px solid transparent;
-    }
-    [data-testid=\"stTabs\"] button:hover {
-        background-color: #F0F4F8;
-    }
-    [data-testid=\"stTabs\"] button[aria-selected=\"true\"] {
-        border-bottom: 3px solid #E8B00F;
-        color: #E8B00F;
-    }
-
-    /********  EXPANDERS  ********/
-    .stExpanderHeader {
-        background-color: #F0F4F8;
-        color: #212529;
-    }
-    .stExpanderContent {
-        background-color: #F8F9FA;
-    }
-
-    /********  METRICS  ********/
-    .stMetric span[data-testid=\"stMetricValue\"] {
-        color: #212529;
-    }
-    .stMetric span[data-testid=\"stMetricDeltaPositive\"],
-    .stMetric span[data-testid=\"stMetricDelta\"] {
-        color: #198754;
-    }
-    .stMetric span[data-testid=\"stMetricDeltaNegative\"] {
-        color: #DC3545;
-    }
-
-    /********  PROGRESS BAR  ********/
-    .stProgress > div > div > div > div {
-        background-color: #E8B00F;
-    }
-
-    /********  DATAFRAMES  ********/
-    .stDataFrame thead th {
-        background-color: #F0F4F8;
-        color: #212529;
-    }
-    .stDataFrame tbody tr:nth-child(even) {
-        background-color: #F8F9FA;
-    }
-    .stDataFrame tbody tr:nth-child(odd) {
-        background-color: #F0F4F8;
-    }
-    .stDataFrame tbody td {
-        border-color: #BCCCDC;
-    }
-
-    /********  CODE BLOCKS  ********/
-    pre[data-testid=\"stMarkdownCodeBlock\"] {
-        background-color: #102A43;
-        color: #F0F4F8;
-        border-radius: 6px;
-    }
-
-    /********  ALERTS  ********/
-    .stAlert {
-        border-left: 0.4rem solid #FFC107; /* default: warning */
-        background-color: #F0F4F8;
-        color: #212529;
-    }
-
-    /********  CHAT  ********/
-    [data-testid=\"stChatMessage\"] {
-        border-radius: 8px;
-        padding: 0.75rem 1rem;
-        margin-bottom: 0.75rem;
-    }
-    /* Assistant (even index) */
-    [data-testid=\"stChatMessage\"]:nth-of-type(2n),
-    [data-testid=\"stChatMessage\"]:nth-of-type(2n) * {
-        background-color: #F0F4F8;
-        color: #212529 !important;
-    }
-    /* User (odd index) */
-    [data-testid=\"stChatMessage\"]:nth-of-type(2n+1),
-    [data-testid=\"stChatMessage\"]:nth-of-type(2n+1) * {
-        background-color: #232D4B;
-        color: #FFFFFF !important;
-    }
-
-    /* Chat input wrapper */
-    [data-testid=\"stChatInput\"] {
-        background-color: #F8F9FA;          /* pill fill */
-        border: 1px solid #F8F9FA;         /* invisible edge */
-        border-radius: 24px;
-        padding: 0.25rem 0.5rem;
-        display: flex;
-        align-items: center;
-    }
-    /* Chat input textarea */
-    [data-testid=\"stChatInput\"] textarea {
-        background: transparent;
-        border: none;
-        padding: 0.75rem 1rem;
-        color: #212529;
-        flex: 1;
-    }
-    /* Focus ring exactly matching border */
-    [data-testid=\"stChatInput\"]:focus-within {
-        border: 1px solid #E8B00F;
-        box-shadow: none; /* remove extra glow so highlight equals border */
-    }
-
-    /* Send-arrow icon */
-    [data-testid=\"stChatInput\"] button svg {
-        stroke: #FFFFFF;
-    }
-    [data-testid=\"stChatInput\"] button:hover svg {
-        stroke: #FFFFFF;
-    }
-
-    /********  SCROLLBAR  (WebKit) ********/
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    ::-webkit-scrollbar-track {
-        background: #BCCCDC;
-    }
-    ::-webkit-scrollbar-thumb {
-        background: #829AB1;
-        border-radius: 8px;
-    }
-    ::-webkit-scrollbar-thumb:hover {
-        background: #486581;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
+    '<link rel="stylesheet" href="./app/static/theme.css">',
+    unsafe_allow_html=True,
 )
 
 # --------------------------------------------------------------------------- #
@@ -254,15 +66,35 @@ st.markdown(
 tab_chat, tab_settings = st.tabs(["💬 Chat", "⚙️ Settings"])
 with tab_settings:
     st.subheader("Model & Index Settings")
-    st.slider("Chunk size (chars)", 300, 2_000, 600, 100, key="chunk_size")
-    st.slider("Chunk overlap (chars)", 0, 1_000, 150, 50, key="chunk_overlap")
-    st.slider("Context chunks (k)", 2, 20, 8, 1, key="top_k")
+    # A form batches slider changes into one rerun on "Apply" instead of a
+    # full script rerun per drag event.
+    with st.form("settings"):
+        st.slider("Chunk size (chars)", 300, 2_000, 600, 100, key="chunk_size")
+        st.slider("Chunk overlap (chars)", 0, 1_000, 150, 50, key="chunk_overlap")
+        st.slider("Context chunks (k)", 2, 20, 8, 1, key="top_k")
+        st.slider(
+            "Chat context messages", 10, 80, 40, 10, key="max_ctx",
+            help="How much recent transcript is sent to the LLM each turn.",
+        )
+        st.form_submit_button("Apply")
     st.caption("Values persist until you refresh the page.")
 
 # --------------------------------------------------------------------------- #
 # Sidebar – PDF upload & indexing                                             #
 # --------------------------------------------------------------------------- #
-with st.sidebar:
+# Each section is a fragment: interacting with a sidebar widget (sheet
+# dropdown, preview toggle, index button) reruns only that section instead
+# of the whole script including the chat loop.
+
+
+@st.cache_resource(show_spinner=False)
+def _load_excel_cached(data: bytes) -> dict[str, pd.DataFrame]:
+    """Parse a workbook once per content – reruns reuse the DataFrames."""
+    return load_excel(io.BytesIO(data))
+
+
+@st.fragment
+def _pdf_sidebar() -> None:
     st.header("📄 PDF Knowledge Base")
     files = st.file_uploader(
         "Upload PDFs", type="pdf", accept_multiple_files=True
@@ -270,6 +102,10 @@ with st.sidebar:
     st.caption(f"Embeddings deployment: {settings.EMBED_DEPLOYMENT}")
 
     if st.button("Build / Update index", disabled=not files):
+        # Deferred import – pulls in LangChain + FAISS, which we only need
+        # once the user actually asks for an index build.
+        from features.pdfs.indexer import index_pdfs, save_vectorstore
+
         vs_existing = st.session_state.get("vectorstore")
         with st.spinner("Indexing…"):
             vectorstore, new_chunks = index_pdfs(
@@ -280,13 +116,20 @@ with st.sidebar:
             )
         if vectorstore:
             st.session_state.vectorstore = vectorstore
+            save_vectorstore(vectorstore)  # warm restarts skip re-embedding
+            if new_chunks and "sem_cache" in st.session_state:
+                # Cached answers may embed RAG context from the old index.
+                st.session_state.sem_cache.clear()
             if new_chunks:
                 st.success(f"Added **{new_chunks:,}** new chunk(s).")
             else:
                 st.info("These PDFs were already indexed – nothing new added.")
         else:
             st.error("No readable text found in the uploaded PDFs.")
-     
+
+
+@st.fragment
+def _excel_sidebar() -> None:
     st.header("📊 Fund Data Excel")
     excel_file = st.file_uploader(
         "Upload Excel",
@@ -297,15 +140,28 @@ with st.sidebar:
 
     if excel_file is not None:
         try:
-            excel_data = load_excel(excel_file)
+            raw = excel_file.getvalue()
+            excel_data = _load_excel_cached(raw)
             st.session_state["excel_data"] = excel_data
+            # Keyed into per-fund memoisation below – one digest per upload.
+            st.session_state["excel_hash"] = hashlib.sha256(raw).hexdigest()[:16]
             sheet_names = list(excel_data)
             if sheet_names:
                 sheet = st.selectbox("Sheet", sheet_names, key="excel_sheet")
-                st.dataframe(excel_data[sheet])
+                # Preview only the head – serialising a full sheet to Arrow
+                # on every rerun is O(rows) for no benefit.
+                df = excel_data[sheet]
+                if len(df) > 200 and not st.checkbox(
+                    f"Show all {len(df):,} rows", key="excel_full"
+                ):
+                    df = df.head(200)
+                st.dataframe(format_dates(df), use_container_width=True)
         except Exception as exc:
             st.error(f"Failed to load Excel: {exc}")
 
+
+@st.fragment
+def _ranking_sidebar() -> None:
     st.header("🏅 Rankings Excel")
     ranking_file = st.file_uploader(
         "Upload Rankings Excel",
@@ -316,18 +172,29 @@ with st.sidebar:
 
     if ranking_file is not None:
         try:
-            ranking_data = load_excel(ranking_file)
+            ranking_data = _load_excel_cached(ranking_file.getvalue())
             st.session_state["ranking_excel_data"] = ranking_data
             ranking_sheet_names = list(ranking_data)
             if ranking_sheet_names:
                 r_sheet = st.selectbox(
                     "Rankings Sheet", ranking_sheet_names, key="ranking_sheet"
                 )
-                st.dataframe(ranking_data[r_sheet])
+                r_df = ranking_data[r_sheet]
+                if len(r_df) > 200 and not st.checkbox(
+                    f"Show all {len(r_df):,} rows", key="ranking_full"
+                ):
+                    r_df = r_df.head(200)
+                st.dataframe(format_dates(r_df), use_container_width=True)
         except Exception as exc:
             st.error(f"Failed to load rankings Excel: {exc}")
 
 
+with st.sidebar:
+    _pdf_sidebar()
+    _excel_sidebar()
+    _ranking_sidebar()
+
+
 # --------------------------------------------------------------------------- #
 # Conversation history                                                        #
 # --------------------------------------------------------------------------- #
@@ -335,28 +202,698 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "charts" not in st.session_state:
     st.session_state.charts = []
+if "sem_cache" not in st.session_state:
+    st.session_state.sem_cache = SemanticCache()
+if "vectorstore" not in st.session_state and Path(
+    ".cache/vectorstore/index.faiss"
+).exists():
+    # Existence check first so cold sessions without a persisted index
+    # never pay the LangChain import.
+    from features.pdfs.indexer import load_vectorstore
+
+    vs = load_vectorstore()
+    if vs is not None:
+        st.session_state.vectorstore = vs
+
+# How many transcript messages are rendered per rerun; older ones sit
+# behind an opt-in toggle so long sessions stay O(tail) per keystroke.
+DISPLAY_TAIL = 100
+
+
+@st.fragment
+def render_history() -> None:
+    """Render the transcript inside a fragment so widget interactions
+    elsewhere in the script don't re-render every prior message."""
+    msgs = st.session_state.messages
+    if len(msgs) > DISPLAY_TAIL and not st.checkbox(
+        f"Show {len(msgs) - DISPLAY_TAIL} earlier messages", key="full_history"
+    ):
+        msgs = msgs[-DISPLAY_TAIL:]
+    for m in msgs:
+        st.chat_message(m["role"]).markdown(m["content"])
+
+
+@st.fragment
+def render_charts() -> None:
+    """Replay persisted charts; pies are stored as encoded PNG bytes so no
+    matplotlib re-render happens here."""
+    for c in st.session_state.charts:
+        st.subheader(c.get("title", "Chart"))
+        if c.get("type") == "pie":
+            st.image(c.get("image"))
+        elif c.get("type") == "line":
+            st.line_chart(c.get("data"))
+
+
+render_history()
+render_charts()
+
+# --------------------------------------------------------------------------- #
+# Tool handlers                                                               #
+# --------------------------------------------------------------------------- #
+# Each handler takes the decoded tool arguments plus the raw user input and
+# returns the tool_content string fed back to the LLM. UI side-effects
+# (st.markdown, st.table, charts) happen inside the handler. The dispatch
+# table below replaces the previous if/elif chain with an O(1) lookup.
+
+
+# Session-level caches for Yahoo lookups: repeat questions about the same
+# ticker within the TTL serve from the local cache instead of re-fetching.
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_quote(ticker: str) -> dict:
+    return get_stock_quote(ticker)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_fx(pair: str) -> dict:
+    return get_fx_rate(pair)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_history_daily(ticker: str, period: str, interval: str) -> list[tuple[str, float]]:
+    return get_stock_history(ticker, period=period, interval=interval)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_history_intraday(ticker: str, period: str, interval: str) -> list[tuple[str, float]]:
+    return get_stock_history(ticker, period=period, interval=interval)
+
+
+def _cached_history(ticker: str, period: str, interval: str) -> list[tuple[str, float]]:
+    """Daily+ bars are stable for hours; intraday bars go stale in seconds."""
+    if interval.endswith(("m", "h")):
+        return _cached_history_intraday(ticker, period, interval)
+    return _cached_history_daily(ticker, period, interval)
+
+
+def _json_dumps(obj) -> str:
+    """orjson dump to str; handles numpy scalars in tool payloads."""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def _handle_pie(args: dict, user_input: str) -> str:
+    from features.analytics.charts import draw_pie  # deferred – matplotlib
+
+    draw_pie(args["labels"], args["values"], title="Pie Chart")
+    return "Pie chart rendered."
+
+
+# Metric keys reported as percentages in tool summaries.
+PCT_KEYS = frozenset(
+    {"cumulative_return", "annualized_return", "annualized_volatility", "max_drawdown"}
+)
+
+# Title-cased display labels for the standard metric keys, computed once
+# instead of str.replace().title() per key per turn.
+_METRIC_LABELS = {k: k.replace("_", " ").title() for k in PCT_KEYS}
+
+
+def _is_missing(value) -> bool:
+    """NaN/None check on scalars without pandas dispatch overhead."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _format_metrics(
+    metrics, *, titlecase: bool = False, skip_missing: bool = False
+) -> str:
+    """One-line ``key: value`` summary shared by the metrics handlers."""
+    parts: list[str] = []
+    for key, value in metrics.items():
+        if titlecase:
+            label = _METRIC_LABELS.get(key) or key.replace("_", " ").title()
+        else:
+            label = key
+        if _is_missing(value):
+            if not skip_missing:
+                parts.append(f"{label}: Unable to calculate")
+        elif key in PCT_KEYS:
+            parts.append(f"{label}: {value * 100:.2f}%")
+        else:
+            parts.append(f"{label}: {value:.4f}")
+    return "; ".join(parts)
+
+
+def _handle_portfolio_metrics(args: dict, user_input: str) -> str:
+    try:
+        metrics = compute_portfolio_metrics(
+            args["series"],
+            is_prices=args.get("is_prices", True),
+            periods_per_year=args.get("periods_per_year"),
+            returns_are_percent=args.get("returns_are_percent"),
+            dates=args.get("dates"),
+        )
+
+        # Check if any metrics could be calculated
+        if all(_is_missing(v) for v in metrics.values()):
+            st.warning("Portfolio metrics could not be calculated from the provided data.")
+            return "Unable to calculate portfolio metrics. The provided data may be insufficient (empty series, all NaN values, or only one data point). Please check that you have provided a valid time series of prices or returns."
+
+        render_metrics_table(metrics)
+        # Include the actual metrics in the tool response
+        return f"Portfolio metrics calculated. Results: {_format_metrics(metrics)}"
+
+    except Exception as exc:
+        st.error(f"Error calculating portfolio metrics: {exc}")
+        return f"Error calculating portfolio metrics: {exc}. Please ensure the data is a valid numeric series."
+
+
+def _handle_portfolio_metrics_from_excel(args: dict, user_input: str) -> str:
+    excel_data = st.session_state.get("excel_data")
+    if not excel_data:
+        return "No Excel data available. Please upload an Excel file first."
+
+    sheet = args.get("sheet")
+    if sheet not in excel_data:
+        sheet = next(iter(excel_data))
+    df = excel_data[sheet]
+    is_prices = args.get("is_prices", False)
+    returns_are_percent = args.get("returns_are_percent", False)
+    try:
+        ppy = args.get("periods_per_year", 12)
+        # Coerce both columns to ndarrays up front and mask once – no
+        # pandas alignment machinery on the per-row path.
+        dates = pd.to_datetime(df.iloc[:, 0], errors="coerce").to_numpy()
+        values = pd.to_numeric(df.iloc[:, 1], errors="coerce").to_numpy(dtype="float64")
+        mask = ~np.isnan(values) & ~np.isnat(dates)
+        metrics = compute_portfolio_metrics(
+            values[mask],
+            is_prices=is_prices,
+            periods_per_year=ppy,
+            returns_are_percent=returns_are_percent,
+            dates=dates[mask],
+        )
+
+        if all(_is_missing(v) for v in metrics.values()):
+            st.warning("Portfolio metrics could not be calculated from the Excel data.")
+            return "Unable to calculate portfolio metrics from Excel data."
+
+        render_metrics_table(metrics)
+        return (
+            f"Portfolio metrics calculated from sheet '{sheet}'. "
+            f"Results: {_format_metrics(metrics)}"
+        )
+    except Exception as exc:
+        tool_content = f"Error calculating portfolio metrics from Excel: {exc}"
+        st.error(tool_content)
+        return tool_content
+
+
+def _handle_yearly_performance(args: dict, user_input: str) -> str:
+    # Sort the year keys up front and build the frame in one allocation
+    # instead of from_dict followed by a post-hoc sort_index.
+    yp = yearly_performance(args["dates"], args["returns"])
+    years = sorted(yp)
+    # Pre-formatted strings through st.dataframe's Arrow path – the pandas
+    # Styler HTML pipeline is by far the slowest part of st.table here.
+    year_df = pd.DataFrame({"Return": [f"{yp[y]:.2%}" for y in years]}, index=years)
+    st.markdown("### Yearly Performance")
+    st.dataframe(year_df, use_container_width=True)
+    return "Yearly performance table rendered."
+
+
+# One compiled scan over the prompt instead of a lowercase + substring
+# search per hint; the first matched character picks the Yahoo period.
+_PERIOD_RE = re.compile(r"(6\s*months?|3\s*months?|ytd)", re.I)
+_PERIOD_MAP = {"6": "6mo", "3": "3mo", "y": "ytd"}
+
+
+def _history_period(args: dict, user_input: str) -> str:
+    if args.get("period"):
+        return args["period"]
+    m = _PERIOD_RE.search(user_input)
+    return _PERIOD_MAP[m.group(1)[0].lower()] if m else "1y"
+
+
+def _handle_stock_quote(args: dict, user_input: str, prefetched=None) -> str:
+    q = prefetched or _cached_quote(args["ticker"])
+    st.markdown(
+        f"**{q['symbol']}** – {q.get('currency','')} "
+        f"{q['price']:.2f} ({q['changePct']:+.2f} %)\n\n"
+        f"Market cap: {q['marketCap'] or 'N/A'}\n\n"
+        f"Trailing P/E: {q['pe'] or 'N/A'}"
+    )
+    return _json_dumps(q)
+
+
+def _handle_fx_rate(args: dict, user_input: str, prefetched=None) -> str:
+    fx = prefetched or _cached_fx(args["pair"])
+    st.markdown(
+        f"**{fx['pair']}** {fx['rate']:.4f} ({fx['changePct']:+.2f}%)"
+    )
+    return _json_dumps(fx)
+
+
+def _handle_stock_history(args: dict, user_input: str, prefetched=None) -> str:
+    series = prefetched or _cached_history(
+        args["ticker"],
+        _history_period(args, user_input),
+        args.get("interval", "1d"),
+    )
+    tool_content = _json_dumps({"series": series})
+
+    # cache for later draw-down queries – dates and prices as two
+    # contiguous arrays instead of a Python list of tuples
+    st.session_state["last_series"] = (
+        np.array([d for d, _ in series], dtype="datetime64[D]"),
+        np.fromiter((p for _, p in series), dtype="float64", count=len(series)),
+    )
+
+    if len(series) > 1 and any(k in user_input.lower() for k in ["plot", "chart", "graph"]):
+        from features.analytics.charts import draw_line_chart  # deferred – matplotlib
+
+        draw_line_chart(series, title=f"Price History: {args['ticker'].upper()}")
+    elif len(series) <= 1:
+        st.warning(
+            "Only one data point returned; unable to plot a series."
+        )
+    return tool_content
+
+
+def _handle_max_drawdown(args: dict, user_input: str) -> str:
+    # explicit series? use it – non-numeric LLM arguments fall through to
+    # the fallbacks instead of killing the rerun
+    try:
+        series_vals = np.asarray(args.get("series") or [], dtype="float64")
+    except (TypeError, ValueError):
+        series_vals = np.asarray([], dtype="float64")
+
+    # fallback 1 – cached series from last history call
+    if series_vals.size == 0:
+        last = st.session_state.get("last_series", ())
+        if isinstance(last, tuple) and len(last) == 2:
+            # (dates, prices) array pair stored by the history handler
+            series_vals = np.asarray(last[1], dtype="float64")
+        else:
+            # older session shapes: list of (date, price) or flat prices
+            try:
+                series_vals = np.fromiter(
+                    (p for _, p in last), dtype="float64", count=len(last)
+                )
+            except Exception:
+                try:
+                    series_vals = np.asarray(last, dtype="float64")
+                except Exception:
+                    series_vals = np.asarray([], dtype="float64")
+
+    # fallback 2 – fetch via ticker if provided
+    if series_vals.size == 0 and args.get("ticker"):
+        try:
+            hist = _cached_history(
+                args["ticker"],
+                args.get("period", "1y"),
+                args.get("interval", "1d"),
+            )
+            series_vals = np.fromiter(
+                (p for _, p in hist), dtype="float64", count=len(hist)
+            )
+        except Exception as exc:
+            st.error(f"Failed to fetch stock history for {args.get('ticker')}: {exc}")
+
+    if series_vals.size <= 1:
+        st.warning(
+            "No price series available to compute draw-down."
+        )
+        dd = float("nan")
+        tool_content = f"Unable to calculate maximum drawdown: insufficient data (only {series_vals.size} data point(s) available). Need at least 2 data points for drawdown calculation."
+    else:
+        try:
+            dd = max_drawdown(
+                series_vals, is_prices=args.get("is_prices", True)
+            )
+            if pd.isna(dd):
+                st.warning("Maximum drawdown calculation returned NaN.")
+                tool_content = "Maximum drawdown could not be calculated (result was NaN). This may indicate invalid data in the price series."
+            else:
+                st.markdown(f"**Maximum draw-down:** {dd*100:.2f}%")
+                tool_content = f"Maximum drawdown calculated: {dd*100:.2f}% (based on {series_vals.size} data points)"
+        except Exception as exc:
+            dd = float("nan")
+            tool_content = f"Error calculating maximum drawdown: {exc}"
+            st.error(f"Error in drawdown calculation: {exc}")
+
+    # Include the numeric result for further processing
+    return tool_content + f" | JSON: {_json_dumps({'max_drawdown': dd})}"
+
+
+def _rows_json(df: pd.DataFrame, rows: int) -> str:
+    """Serialise the head of *df* as records through orjson's C encoder
+    instead of pandas' Python-level JSON writer."""
+    # orjson rejects pd.Timestamp, so render datetime columns to strings
+    # on the head slice before dumping.
+    head = format_dates(df.head(rows))
+    records = head.where(head.notna(), None).to_dict(orient="records")
+    return orjson.dumps(records, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def _handle_excel_data(args: dict, user_input: str) -> str:
+    excel_data = st.session_state.get("excel_data")
+    if not excel_data:
+        return "No Excel data available."
+    sheet = args.get("sheet")
+    rows = int(args.get("rows", 5))
+    df = excel_data.get(sheet)
+    if df is None:
+        return f"Sheet '{sheet}' not found."
+    return _rows_json(df, rows)
+
+
+def _handle_ranking_excel_data(args: dict, user_input: str) -> str:
+    ranking_data = st.session_state.get("ranking_excel_data")
+    if not ranking_data:
+        return "No rankings Excel available."
+    sheet = args.get("sheet")
+    rows = int(args.get("rows", 5))
+    df = ranking_data.get(sheet)
+    if df is None:
+        return f"Sheet '{sheet}' not found in rankings workbook."
+    return _rows_json(df, rows)
+
+
+def _handle_list_sheets(args: dict, user_input: str) -> str:
+    excel_data = st.session_state.get("excel_data")
+    if not excel_data:
+        return "No Excel data available. Please upload an Excel file first."
+    return _json_dumps({"sheets": list(excel_data.keys())})
+
 
-for m in st.session_state.messages:
-    st.chat_message(m["role"]).markdown(m["content"])
-for c in st.session_state.charts:
-    st.subheader(c.get("title", "Chart"))
-    if c.get("type") == "pie":
-        st.image(c.get("image"))
-    elif c.get("type") == "line":
-        st.line_chart(c.get("data"))
+@st.cache_data(show_spinner=False)
+def _fund_series_cached(file_hash: str, sheet: str, fund_name: str):
+    """Memoise the header/first-row column scan per (workbook, sheet, fund)."""
+    return get_fund_series(st.session_state["excel_data"], sheet, fund_name)
+
+
+def _fund_series(excel_data: dict, sheet: str, fund_name: str):
+    file_hash = st.session_state.get("excel_hash")
+    if file_hash:
+        return _fund_series_cached(file_hash, sheet, fund_name)
+    return get_fund_series(excel_data, sheet, fund_name)
+
+
+def _handle_fund_series(args: dict, user_input: str) -> str:
+    excel_data = st.session_state.get("excel_data")
+    if not excel_data:
+        return "No Excel data available. Please upload an Excel file first."
+
+    sheet = args.get("sheet")
+    fund_name = args.get("fund_name")
+
+    # Check if sheet exists
+    if sheet not in excel_data:
+        available_sheets = list(excel_data.keys())
+        return f"Sheet '{sheet}' not found. Available sheets: {', '.join(available_sheets)}"
+
+    try:
+        series = _fund_series(excel_data, sheet, fund_name)
+        if series is None:
+            # Provide more helpful information about what was searched
+            df = excel_data[sheet]
+            col_names = [str(c) for c in df.columns]
+            first_row_values = df.iloc[0].astype(str).tolist() if not df.empty else []
+
+            search_info = f"Searched in column headers: {col_names[:10]}{'...' if len(col_names) > 10 else ''}"
+            if first_row_values:
+                search_info += f" and first row values: {first_row_values[:10]}{'...' if len(first_row_values) > 10 else ''}"
+
+            return f"Fund '{fund_name}' not found in sheet '{sheet}'. {search_info}. Please check the exact fund name spelling or try a different sheet."
+
+        if len(series) > 0:
+            return _json_dumps(series) + f" (Found {len(series)} data points for fund '{fund_name}')"
+        return f"Fund '{fund_name}' column found but contains no valid numeric data."
+    except Exception as exc:
+        st.error(f"Error retrieving fund data: {exc}")
+        return f"Error retrieving fund series for '{fund_name}': {exc}"
+
+
+def _handle_fund_month_value(args: dict, user_input: str) -> str:
+    excel_data = st.session_state.get("excel_data")
+    if not excel_data:
+        return "No Excel data available. Please upload an Excel file first."
+
+    sheet = args.get("sheet")
+    fund_name = args.get("fund_name")
+    month = args.get("month")
+    if sheet not in excel_data:
+        available_sheets = list(excel_data.keys())
+        return (
+            f"Sheet '{sheet}' not found. Available sheets: {', '.join(available_sheets)}"
+        )
+    try:
+        value = get_fund_month_value(excel_data, sheet, fund_name, month)
+        if value is None:
+            return (
+                f"Value for fund '{fund_name}' in '{month}' not found."
+            )
+        return _json_dumps({"value": value})
+    except Exception as exc:
+        st.error(f"Error retrieving fund value: {exc}")
+        return f"Error retrieving fund value: {exc}"
+
+
+def _handle_fund_rankings(args: dict, user_input: str) -> str:
+    ranking_data = st.session_state.get("ranking_excel_data")
+    if not ranking_data:
+        return "No rankings Excel available. Please upload a rankings file first."
+
+    ticker = args.get("ticker")
+    sheet = args.get("sheet")
+    try:
+        rankings = get_fund_rankings(ranking_data, ticker, sheet)
+        if rankings is None:
+            return (
+                f"Ticker '{ticker}' not found in the rankings workbook."
+            )
+        return _json_dumps(rankings)
+    except Exception as exc:
+        tool_content = f"Error retrieving fund rankings: {exc}"
+        st.error(tool_content)
+        return tool_content
+
+
+# Well-known sheet names probed before the rest of the workbook.
+_PREFERRED_SHEETS = ("Main Funds", "Sheet1", "Fund Data")
+
+
+@st.cache_data(show_spinner=False)
+def _sheet_order_cached(file_hash: str) -> tuple[str, ...]:
+    """Workbook-constant probe order: preferred names first, then the rest."""
+    excel_data = st.session_state["excel_data"]
+    return tuple(
+        s for s in dict.fromkeys([*_PREFERRED_SHEETS, *excel_data]) if s in excel_data
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _fund_metrics_cached(
+    file_hash: str,
+    sheet: str,
+    fund_name: str,
+    is_prices: bool,
+    returns_are_percent: bool,
+):
+    """Memoise metrics per (workbook, sheet, fund, options) across turns."""
+    series = _fund_series_cached(file_hash, sheet, fund_name)
+    if series is None or len(series) <= 1:
+        return None, 0
+    metrics = compute_portfolio_metrics(
+        series,
+        is_prices=is_prices,
+        periods_per_year=12,  # Monthly data assumed
+        returns_are_percent=returns_are_percent,
+    )
+    return metrics, len(series)
+
+
+def _handle_fund_metrics(args: dict, user_input: str) -> str:
+    excel_data = st.session_state.get("excel_data")
+    if not excel_data:
+        return "No Excel data available. Please upload an Excel file first."
+
+    fund_name = args.get("fund_name")
+    sheet = args.get("sheet")
+    is_prices = args.get("is_prices", False)
+    returns_are_percent = args.get("returns_are_percent", False)
+
+    file_hash = st.session_state.get("excel_hash")
+
+    # Requested sheet first, then the common names, then everything else.
+    # The workbook-constant tail is memoised per upload digest.
+    if file_hash:
+        base = _sheet_order_cached(file_hash)
+    else:
+        base = tuple(
+            s
+            for s in dict.fromkeys([*_PREFERRED_SHEETS, *excel_data])
+            if s in excel_data
+        )
+    if sheet in excel_data:
+        sheets_to_try = [sheet, *(s for s in base if s != sheet)]
+    else:
+        sheets_to_try = list(base)
+
+    for sheet_name in sheets_to_try:
+        try:
+            if file_hash:
+                metrics, n_points = _fund_metrics_cached(
+                    file_hash, sheet_name, fund_name, is_prices, returns_are_percent
+                )
+            else:
+                series = _fund_series(excel_data, sheet_name, fund_name)
+                if series is None or len(series) <= 1:
+                    continue
+                metrics = compute_portfolio_metrics(
+                    series,
+                    is_prices=is_prices,
+                    periods_per_year=12,  # Monthly data assumed
+                    returns_are_percent=returns_are_percent,
+                )
+                n_points = len(series)
+
+            # Check if metrics were calculated successfully
+            if metrics is not None and any(
+                not _is_missing(v) for v in metrics.values()
+            ):
+                # Render the table
+                render_metrics_table(metrics)
+
+                metrics_text = _format_metrics(
+                    metrics, titlecase=True, skip_missing=True
+                )
+                return f"Successfully calculated metrics for '{fund_name}' from sheet '{sheet_name}' (using {n_points} data points). {metrics_text}"
+        except Exception:
+            continue  # Try next sheet
+
+    available_sheets = list(excel_data.keys())
+    return f"Fund '{fund_name}' not found in any available sheets: {', '.join(available_sheets)}. Please check the fund name spelling or upload the correct Excel file."
+
+
+def _handle_unknown(args: dict, user_input: str, *, name: str = "") -> str:
+    return f"Unknown tool call: {name}"
+
+
+# Network-bound fetches that are independent of Streamlit and of each other.
+# When the LLM returns several of these in one turn they run concurrently so
+# the turn costs max(latency) instead of the sum of all Yahoo round-trips.
+_MARKET_FETCHERS = {
+    "get_stock_quote": lambda args, user_input: _cached_quote(args["ticker"]),
+    "get_fx_rate": lambda args, user_input: _cached_fx(args["pair"]),
+    "get_stock_history": lambda args, user_input: _cached_history(
+        args["ticker"],
+        _history_period(args, user_input),
+        args.get("interval", "1d"),
+    ),
+}
+
+
+def _prefetch_market_calls(tool_calls, user_input: str) -> dict[str, object]:
+    """Run Yahoo-bound tool calls in a thread pool; return {call_id: result}.
+
+    Failed fetches are left out so the handler retries inline and keeps its
+    existing error reporting. Streamlit rendering stays on the main thread.
+    """
+    network_calls = [
+        c for c in tool_calls if c.function.name in _MARKET_FETCHERS
+    ]
+    if len(network_calls) < 2:
+        return {}
+
+    results: dict[str, object] = {}
+
+    # History calls sharing (period, interval) collapse into one batched
+    # Yahoo request instead of a round-trip per ticker.
+    history_groups: dict[tuple[str, str], list] = {}
+    for c in network_calls:
+        if c.function.name == "get_stock_history":
+            args = orjson.loads(c.function.arguments)
+            key = (_history_period(args, user_input), args.get("interval", "1d"))
+            history_groups.setdefault(key, []).append((c, args))
+
+    for (period, interval), group in history_groups.items():
+        if len(group) < 2:
+            continue
+        try:
+            histories = get_stock_histories(
+                [a["ticker"] for _, a in group], period=period, interval=interval
+            )
+        except Exception:
+            continue  # handlers fall back to per-ticker fetches
+        for c, a in group:
+            series = histories.get(a["ticker"])
+            if series:
+                results[c.id] = series
+
+    remaining = [c for c in network_calls if c.id not in results]
+    if remaining:
+        with ThreadPoolExecutor(max_workers=min(8, len(remaining))) as ex:
+            futures = {
+                ex.submit(
+                    _MARKET_FETCHERS[c.function.name],
+                    orjson.loads(c.function.arguments),
+                    user_input,
+                ): c.id
+                for c in remaining
+            }
+            for fut, call_id in futures.items():
+                try:
+                    results[call_id] = fut.result()
+                except Exception:
+                    pass  # handler will re-fetch and surface the error
+    return results
+
+
+TOOL_HANDLERS: dict[str, Callable[..., str]] = {
+    "create_pie_chart": _handle_pie,
+    "calculate_portfolio_metrics": _handle_portfolio_metrics,
+    "calculate_portfolio_metrics_from_excel": _handle_portfolio_metrics_from_excel,
+    "calculate_yearly_performance": _handle_yearly_performance,
+    "get_stock_quote": _handle_stock_quote,
+    "get_fx_rate": _handle_fx_rate,
+    "get_stock_history": _handle_stock_history,
+    "calculate_max_drawdown": _handle_max_drawdown,
+    "get_excel_data": _handle_excel_data,
+    "get_ranking_excel_data": _handle_ranking_excel_data,
+    "list_excel_sheets": _handle_list_sheets,
+    "get_fund_series": _handle_fund_series,
+    "get_fund_month_value": _handle_fund_month_value,
+    "get_fund_rankings": _handle_fund_rankings,
+    "calculate_fund_metrics": _handle_fund_metrics,
+}
+
+# Tools whose handler already renders the full answer (chart or table) in the
+# chat area; a follow-up completion would only paraphrase "done".
+TERMINAL_TOOLS = {
+    "create_pie_chart",
+    "calculate_yearly_performance",
+}
 
 # --------------------------------------------------------------------------- #
 # Chat loop                                                                   #
 # --------------------------------------------------------------------------- #
+# The transcript is kept in full for display, but only a sliding window is
+# sent to Azure so per-turn token cost stays constant over long sessions.
+MAX_CONTEXT_MESSAGES = 40  # default; tunable via the Settings tab slider
+
+
+def _context_window() -> list[dict[str, str]]:
+    keep = st.session_state.get("max_ctx", MAX_CONTEXT_MESSAGES)
+    return st.session_state.messages[-keep:]
+
+
 user_input = st.chat_input("Ask me anything…")
 if user_input:
     st.chat_message("user").markdown(user_input)
     st.session_state.messages.append({"role": "user", "content": user_input})
 
     # ---------------- first LLM call -------------------------------------- #
+    # Near-duplicate questions are served from the semantic cache instead of
+    # paying another Azure round-trip.
+    try:
+        cached_response = st.session_state.sem_cache.lookup(user_input)
+    except Exception:
+        cached_response = None  # cache must never break the chat loop
+
     try:
-        response = ask_llm(
-            st.session_state.messages,
+        response = cached_response or ask_llm(
+            _context_window(),
             st.session_state.get("vectorstore"),
             user_input,
             top_k=st.session_state.get("top_k", 8),
@@ -377,395 +914,18 @@ if user_input:
 
     # ---------------- tool dispatcher ------------------------------------- #
     if choice.finish_reason == "tool_calls" and choice.message.tool_calls:
+        prefetched = _prefetch_market_calls(choice.message.tool_calls, user_input)
         for call in choice.message.tool_calls:
             name = call.function.name
-            args = json.loads(call.function.arguments)
+            args = orjson.loads(call.function.arguments)
 
-            # ---------- pie ------------------------------------------------ #
-            if name == "create_pie_chart":
-                draw_pie(args["labels"], args["values"], title="Pie Chart")
-                tool_content = "Pie chart rendered."
-
-            # ---------- portfolio metrics --------------------------------- #
-            elif name == "calculate_portfolio_metrics":
-                try:
-                    metrics = compute_portfolio_metrics(
-                        args["series"],
-                        is_prices=args.get("is_prices", True),
-                        periods_per_year=args.get("periods_per_year"),
-                        returns_are_percent=args.get("returns_are_percent"),
-                        dates=args.get("dates"),
-                    )
-                    
-                    # Check if any metrics could be calculated
-                    valid_metrics = {k: v for k, v in metrics.items() if not pd.isna(v)}
-                    
-                    if not valid_metrics:
-                        tool_content = "Unable to calculate portfolio metrics. The provided data may be insufficient (empty series, all NaN values, or only one data point). Please check that you have provided a valid time series of prices or returns."
-                        st.warning("Portfolio metrics could not be calculated from the provided data.")
-                    else:
-                        render_metrics_table(metrics)
-                        # Include the actual metrics in the tool response
-                        metrics_summary = []
-                        for key, value in metrics.items():
-                            if pd.isna(value):
-                                metrics_summary.append(f"{key}: Unable to calculate")
-                            else:
-                                if key in ["cumulative_return", "annualized_return", "annualized_volatility", "max_drawdown"]:
-                                    metrics_summary.append(f"{key}: {value*100:.2f}%")
-                                else:
-                                    metrics_summary.append(f"{key}: {value:.4f}")
-                        
-                        tool_content = f"Portfolio metrics calculated. Results: {'; '.join(metrics_summary)}"
-                        
-                except Exception as exc:
-                    tool_content = f"Error calculating portfolio metrics: {exc}. Please ensure the data is a valid numeric series."
-                    st.error(f"Error calculating portfolio metrics: {exc}")
-
-            # ---------- portfolio metrics from excel -------------------- #
-            elif name == "calculate_portfolio_metrics_from_excel":
-                excel_data = st.session_state.get("excel_data")
-                if not excel_data:
-                    tool_content = "No Excel data available. Please upload an Excel file first."
-                else:
-                    sheet = args.get("sheet")
-                    if sheet not in excel_data:
-                        sheet = next(iter(excel_data))
-                    df = excel_data[sheet]
-                    is_prices = args.get("is_prices", False)
-                    returns_are_percent = args.get("returns_are_percent", False)
-                    try:
-                        ppy = args.get("periods_per_year", 12)
-                        dates = pd.to_datetime(df.iloc[:, 0], errors="coerce")
-                        values = pd.to_numeric(df.iloc[:, 1], errors="coerce")
-                        mask = dates.notna() & values.notna()
-                        metrics = compute_portfolio_metrics(
-                            values[mask].tolist(),
-                            is_prices=is_prices,
-                            periods_per_year=ppy,
-                            returns_are_percent=returns_are_percent,
-                            dates=dates[mask].tolist(),
-                        )
-
-                        valid_metrics = {k: v for k, v in metrics.items() if not pd.isna(v)}
-                        if not valid_metrics:
-                            tool_content = "Unable to calculate portfolio metrics from Excel data."
-                            st.warning("Portfolio metrics could not be calculated from the Excel data.")
-                        else:
-                            render_metrics_table(metrics)
-                            metrics_summary = []
-                            for key, value in metrics.items():
-                                if pd.isna(value):
-                                    metrics_summary.append(f"{key}: Unable to calculate")
-                                else:
-                                    if key in ["cumulative_return", "annualized_return", "annualized_volatility", "max_drawdown"]:
-                                        metrics_summary.append(f"{key}: {value*100:.2f}%")
-                                    else:
-                                        metrics_summary.append(f"{key}: {value:.4f}")
-                            tool_content = f"Portfolio metrics calculated from sheet '{sheet}'. Results: {'; '.join(metrics_summary)}"
-                    except Exception as exc:
-                        tool_content = f"Error calculating portfolio metrics from Excel: {exc}"
-                        st.error(tool_content)
-
-            # ---------- yearly perf --------------------------------------- #
-            elif name == "calculate_yearly_performance":
-                year_df = pd.DataFrame.from_dict(
-                    yearly_performance(args["dates"], args["returns"]),
-                    orient="index",
-                    columns=["Return"],
-                ).sort_index()
-                st.markdown("### Yearly Performance")
-                st.table(year_df.style.format({"Return": "{:.2%}"}))
-                tool_content = "Yearly performance table rendered."
-
-            # ---------- live quote ---------------------------------------- #
-            elif name == "get_stock_quote":
-                q = get_stock_quote(args["ticker"])
-                st.markdown(
-                    f"**{q['symbol']}** – {q.get('currency','')} "
-                    f"{q['price']:.2f} ({q['changePct']:+.2f} %)\n\n"
-                    f"Market cap: {q['marketCap'] or 'N/A'}\n\n"
-                    f"Trailing P/E: {q['pe'] or 'N/A'}"
-                )
-                tool_content = json.dumps(q)
-
-            # ---------- fx rate ------------------------------------------- #
-            elif name == "get_fx_rate":
-                fx = get_fx_rate(args["pair"])
-                st.markdown(
-                    f"**{fx['pair']}** {fx['rate']:.4f} ({fx['changePct']:+.2f}%)"
-                )
-                tool_content = json.dumps(fx)
-
-            # ---------- price history ------------------------------------- #
-            elif name == "get_stock_history":
-                period_hint = args.get("period") or (
-                    "6mo"
-                    if "6 month" in user_input.lower()
-                    else (
-                        "3mo"
-                        if "3 month" in user_input.lower()
-                        else "ytd" if "ytd" in user_input.lower() else "1y"
-                    )
-                )
-                series = get_stock_history(
-                    args["ticker"],
-                    period=period_hint,
-                    interval=args.get("interval", "1d"),
-                )
-                tool_content = json.dumps({"series": series})
-
-                # cache for later draw-down queries
-                st.session_state["last_series"] = [p for _, p in series]
-
-                if len(series) > 1 and any(k in user_input.lower() for k in ["plot", "chart", "graph"]):
-                    dates, prices = zip(*series)
-                    draw_line_chart(dates, prices, title=f"Price History: {args['ticker'].upper()}")
-                elif len(series) <= 1:
-                    st.warning(
-                        "Only one data point returned; unable to plot a series."
-                    )
-
-            # ---------- max draw-down ------------------------------------- #
-            elif name == "calculate_max_drawdown":
-                # explicit series? use it
-                series_vals = args.get("series") or []
-
-                # fallback 1 – cached series from last history call
-                if not series_vals:
-                    try:
-                        series_vals = [
-                            p
-                            for _, p in st.session_state.get("last_series", [])
-                        ]
-                    except Exception:
-                        series_vals = st.session_state.get("last_series", [])
-
-                # fallback 2 – fetch via ticker if provided
-                if not series_vals and args.get("ticker"):
-                    try:
-                        series_vals = [
-                            p
-                            for _, p in get_stock_history(
-                                args["ticker"],
-                                period=args.get("period", "1y"),
-                                interval=args.get("interval", "1d"),
-                            )
-                        ]
-                    except Exception as exc:
-                        st.error(f"Failed to fetch stock history for {args.get('ticker')}: {exc}")
-
-                if len(series_vals) <= 1:
-                    st.warning(
-                        "No price series available to compute draw-down."
-                    )
-                    dd = float("nan")
-                    tool_content = f"Unable to calculate maximum drawdown: insufficient data (only {len(series_vals)} data point(s) available). Need at least 2 data points for drawdown calculation."
-                else:
-                    try:
-                        dd = max_drawdown(
-                            series_vals, is_prices=args.get("is_prices", True)
-                        )
-                        if pd.isna(dd):
-                            st.warning("Maximum drawdown calculation returned NaN.")
-                            tool_content = "Maximum drawdown could not be calculated (result was NaN). This may indicate invalid data in the price series."
-                        else:
-                            st.markdown(f"**Maximum draw-down:** {dd*100:.2f}%")
-                            tool_content = f"Maximum drawdown calculated: {dd*100:.2f}% (based on {len(series_vals)} data points)"
-                    except Exception as exc:
-                        dd = float("nan")
-                        tool_content = f"Error calculating maximum drawdown: {exc}"
-                        st.error(f"Error in drawdown calculation: {exc}")
-
-                # Include the numeric result for further processing
-                tool_content += f" | JSON: {json.dumps({'max_drawdown': dd})}"
-
-            # ---------- excel data --------------------------------------- #
-            elif name == "get_excel_data":
-                excel_data = st.session_state.get("excel_data")
-                if not excel_data:
-                    tool_content = "No Excel data available."
-                else:
-                    sheet = args.get("sheet")
-                    rows = int(args.get("rows", 5))
-                    df = excel_data.get(sheet)
-                    if df is None:
-                        tool_content = f"Sheet '{sheet}' not found."
-                    else:
-                        tool_content = df.head(rows).to_json(orient="records")
-
-            # ---------- rankings excel data ------------------------------ #
-            elif name == "get_ranking_excel_data":
-                ranking_data = st.session_state.get("ranking_excel_data")
-                if not ranking_data:
-                    tool_content = "No rankings Excel available."
-                else:
-                    sheet = args.get("sheet")
-                    rows = int(args.get("rows", 5))
-                    df = ranking_data.get(sheet)
-                    if df is None:
-                        tool_content = f"Sheet '{sheet}' not found in rankings workbook."
-                    else:
-                        tool_content = df.head(rows).to_json(orient="records")
-          
-            # ---------- list excel sheets ------------------------------ #
-            elif name == "list_excel_sheets":
-                excel_data = st.session_state.get("excel_data")
-                if not excel_data:
-                    tool_content = "No Excel data available. Please upload an Excel file first."
-                else:
-                    tool_content = json.dumps({"sheets": list(excel_data.keys())})
-            # ---------- fund series from excel ----------------------------- #
-            elif name == "get_fund_series":
-                excel_data = st.session_state.get("excel_data")
-                if not excel_data:
-                    tool_content = "No Excel data available. Please upload an Excel file first."
-                else:
-                    sheet = args.get("sheet")
-                    fund_name = args.get("fund_name")
-                    
-                    # Check if sheet exists
-                    if sheet not in excel_data:
-                        available_sheets = list(excel_data.keys())
-                        tool_content = f"Sheet '{sheet}' not found. Available sheets: {', '.join(available_sheets)}"
-                    else:
-                        try:
-                            series = get_fund_series(excel_data, sheet, fund_name)
-                            if series is None:
-                                # Provide more helpful information about what was searched
-                                df = excel_data[sheet]
-                                col_names = [str(c) for c in df.columns]
-                                first_row_values = df.iloc[0].astype(str).tolist() if not df.empty else []
-                                
-                                search_info = f"Searched in column headers: {col_names[:10]}{'...' if len(col_names) > 10 else ''}"
-                                if first_row_values:
-                                    search_info += f" and first row values: {first_row_values[:10]}{'...' if len(first_row_values) > 10 else ''}"
-                                
-                                tool_content = f"Fund '{fund_name}' not found in sheet '{sheet}'. {search_info}. Please check the exact fund name spelling or try a different sheet."
-                            else:
-                                tool_content = json.dumps(series)
-                                # Also provide summary info
-                                if len(series) > 0:
-                                    tool_content += f" (Found {len(series)} data points for fund '{fund_name}')"
-                                else:
-                                    tool_content = f"Fund '{fund_name}' column found but contains no valid numeric data."
-                        except Exception as exc:
-                            tool_content = f"Error retrieving fund series for '{fund_name}': {exc}"
-                            st.error(f"Error retrieving fund data: {exc}")
-        
-            # ---------- fund value for specific month -------------------- #
-            elif name == "get_fund_month_value":
-                excel_data = st.session_state.get("excel_data")
-                if not excel_data:
-                    tool_content = "No Excel data available. Please upload an Excel file first."
-                else:
-                    sheet = args.get("sheet")
-                    fund_name = args.get("fund_name")
-                    month = args.get("month")
-                    if sheet not in excel_data:
-                        available_sheets = list(excel_data.keys())
-                        tool_content = (
-                            f"Sheet '{sheet}' not found. Available sheets: {', '.join(available_sheets)}"
-                        )
-                    else:
-                        try:
-                            value = get_fund_month_value(excel_data, sheet, fund_name, month)
-                            if value is None:
-                                tool_content = (
-                                    f"Value for fund '{fund_name}' in '{month}' not found."
-                                )
-                            else:
-                                tool_content = json.dumps({"value": value})
-                        except Exception as exc:
-                            tool_content = f"Error retrieving fund value: {exc}"
-                            st.error(f"Error retrieving fund value: {exc}")
-
-            # ---------- fund rankings lookup --------------------------- #
-            elif name == "get_fund_rankings":
-                ranking_data = st.session_state.get("ranking_excel_data")
-                if not ranking_data:
-                    tool_content = "No rankings Excel available. Please upload a rankings file first."
-                else:
-                    ticker = args.get("ticker")
-                    sheet = args.get("sheet")
-                    try:
-                        rankings = get_fund_rankings(ranking_data, ticker, sheet)
-                        if rankings is None:
-                            tool_content = (
-                                f"Ticker '{ticker}' not found in the rankings workbook."
-                            )
-                        else:
-                            tool_content = json.dumps(rankings)
-                    except Exception as exc:
-                        tool_content = f"Error retrieving fund rankings: {exc}"
-                        st.error(tool_content)
-
-            # ---------- combined fund metrics ----------------------------- #
-            elif name == "calculate_fund_metrics":
-                excel_data = st.session_state.get("excel_data")
-                if not excel_data:
-                    tool_content = "No Excel data available. Please upload an Excel file first."
-                else:
-                    fund_name = args.get("fund_name")
-                    sheet = args.get("sheet")
-                    is_prices = args.get("is_prices", False)
-                    returns_are_percent = args.get("returns_are_percent", False)
-
-                    # Determine which sheets to search
-                    if sheet and sheet in excel_data:
-                        sheets_to_try = [sheet]
-                    else:
-                        sheets_to_try = list(excel_data.keys())
-                        if sheet and sheet not in excel_data:
-                            for common_sheet in ["Main Funds", "Sheet1", "Fund Data"]:
-                                if common_sheet in excel_data:
-                                    sheets_to_try.append(common_sheet)
-                        sheets_to_try = list(dict.fromkeys(sheets_to_try))
-                    
-                    fund_found = False
-                    for sheet_name in sheets_to_try:
-                        try:
-                            series = get_fund_series(excel_data, sheet_name, fund_name)
-                            if series is not None and len(series) > 1:
-                                # Calculate metrics
-                                metrics = compute_portfolio_metrics(
-                                    series,
-                                    is_prices=is_prices,
-                                    periods_per_year=12,  # Monthly data assumed
-                                    returns_are_percent=returns_are_percent,
-                                )
-                                
-                                # Check if metrics were calculated successfully
-                                valid_metrics = {k: v for k, v in metrics.items() if not pd.isna(v)}
-                                
-                                if valid_metrics:
-                                    # Render the table
-                                    render_metrics_table(metrics)
-                                    
-                                    # Create detailed response
-                                    metrics_text = []
-                                    for key, value in metrics.items():
-                                        if not pd.isna(value):
-                                            if key in ["cumulative_return", "annualized_return", "annualized_volatility", "max_drawdown"]:
-                                                metrics_text.append(f"{key.replace('_', ' ').title()}: {value*100:.2f}%")
-                                            else:
-                                                metrics_text.append(f"{key.replace('_', ' ').title()}: {value:.4f}")
-                                    
-                                    tool_content = f"Successfully calculated metrics for '{fund_name}' from sheet '{sheet_name}' (using {len(series)} data points). {'; '.join(metrics_text)}"
-                                    fund_found = True
-                                    break
-                                else:
-                                    continue  # Try next sheet
-                        except Exception as exc:
-                            continue  # Try next sheet
-                    
-                    if not fund_found:
-                        available_sheets = list(excel_data.keys())
-                        tool_content = f"Fund '{fund_name}' not found in any available sheets: {', '.join(available_sheets)}. Please check the fund name spelling or upload the correct Excel file."
-
-            # ---------- fallback ------------------------------------------ #
+            handler = TOOL_HANDLERS.get(name)
+            if handler is None:
+                tool_content = _handle_unknown(args, user_input, name=name)
+            elif call.id in prefetched:
+                tool_content = handler(args, user_input, prefetched=prefetched[call.id])
             else:
-                tool_content = f"Unknown tool call: {name}"
+                tool_content = handler(args, user_input)
 
             tool_messages.append(
                 {
@@ -777,33 +937,66 @@ if user_input:
             )
 
         # --------------- second LLM call --------------------------------- #
-        assistant_call_msg = choice.message.model_dump(exclude_none=True)
+        # Purely visual turns (all tools terminal) skip the round-trip.
+        if all(m["name"] in TERMINAL_TOOLS for m in tool_messages):
+            assistant_reply = "Done – see the chart above."
+            st.chat_message("assistant").markdown(assistant_reply)
+            st.session_state.messages.append(
+                {"role": "assistant", "content": assistant_reply}
+            )
+            st.stop()
+
+        # Pydantic's Rust JSON serializer + orjson.loads is cheaper than
+        # model_dump's recursive Python-object walk over the tool-call tree.
+        assistant_call_msg = orjson.loads(
+            choice.message.model_dump_json(exclude_none=True)
+        )
         assistant_call_msg["content"] = assistant_call_msg.get("content") or ""
 
-        # ---------- DEBUG: Print tool messages before second call -------- #
-        print("=== TOOL CALL DEBUG ===")
-        for i, tool_msg in enumerate(tool_messages):
-            print(f"Tool {i+1}: {tool_msg['name']}")
-            print(f"Content: {tool_msg['content'][:200]}{'...' if len(tool_msg['content']) > 200 else ''}")
-            print("---")
-        print("=== END TOOL DEBUG ===")
+        # isEnabledFor short-circuits before any slicing/formatting happens,
+        # unlike the previous print() blocks which always paid it.
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, tool_msg in enumerate(tool_messages):
+                logger.debug(
+                    "tool %d %s: %.200s", i + 1, tool_msg["name"], tool_msg["content"]
+                )
 
         follow_resp = ask_llm(
-            st.session_state.messages + [assistant_call_msg] + tool_messages,
+            _context_window() + [assistant_call_msg] + tool_messages,
             None,
             "",
             top_k=0,
             enable_tools=False,
+            stream=True,
+        )
+        # Render deltas as they arrive – perceived latency drops to
+        # time-to-first-token instead of the full generation time.
+        assistant_reply = st.chat_message("assistant").write_stream(
+            (chunk.choices[0].delta.content or "")
+            for chunk in follow_resp
+            if chunk.choices
+        )
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "follow-up reply (%d chars): %.500s",
+                len(assistant_reply),
+                assistant_reply,
+            )
+
+        st.session_state.messages.append(
+            {"role": "assistant", "content": assistant_reply}
         )
-        assistant_reply = follow_resp.choices[0].message.content or ""
-        
-        # ---------- DEBUG: Print final response ----------------------- #
-        print(f"=== FINAL LLM RESPONSE DEBUG ===")
-        print(f"Response length: {len(assistant_reply)}")
-        print(f"Response content: '{assistant_reply[:500]}{'...' if len(assistant_reply) > 500 else ''}'")
-        print("=== END RESPONSE DEBUG ===")
+        st.stop()  # already rendered by write_stream
     else:
         assistant_reply = choice.message.content or ""
+        # Tool-free answers are deterministic for a given question – safe
+        # to serve again for similar phrasings later in the session.
+        if cached_response is None:
+            try:
+                st.session_state.sem_cache.store(user_input, response)
+            except Exception:
+                pass
 
     st.chat_message("assistant").markdown(assistant_reply)
     st.session_state.messages.append(
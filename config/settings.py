@@ -1,38 +1,85 @@
+from functools import cached_property
 from urllib.parse import urlsplit
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _base_url(endpoint):
+    """Return scheme://netloc for *endpoint*, or None when unset."""
+    if not endpoint:
+        return None
+    parts = urlsplit(endpoint)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
 class Settings:
-    """Centralised environment & endpoint configuration."""
+    """Centralised environment & endpoint configuration.
+
+    Values are resolved lazily on first access (and cached), so importing
+    this module never parses URLs or raises on missing environment —
+    misconfiguration surfaces when a consumer first needs a credential.
+    """
 
     # --- Core chat deployment ---
-    API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-    CHAT_DEPLOYMENT = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME")
-    API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2025-01-01-preview").strip('"')
-    RAW_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
+    @cached_property
+    def API_KEY(self):
+        return os.getenv("AZURE_OPENAI_API_KEY")
+
+    @cached_property
+    def CHAT_DEPLOYMENT(self):
+        return os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME")
+
+    @cached_property
+    def API_VERSION(self):
+        return os.getenv("AZURE_OPENAI_API_VERSION", "2025-01-01-preview").strip('"')
 
-    BASE_ENDPOINT = (
-        f"{urlsplit(RAW_ENDPOINT).scheme}://{urlsplit(RAW_ENDPOINT).netloc}"
-        if RAW_ENDPOINT
-        else None
-    )
+    @cached_property
+    def RAW_ENDPOINT(self):
+        return os.getenv("AZURE_OPENAI_ENDPOINT")
+
+    @cached_property
+    def BASE_ENDPOINT(self):
+        self.validate()
+        return _base_url(self.RAW_ENDPOINT)
 
     # --- Embeddings deployment ---
-    EMBED_KEY = os.getenv("AZURE_OPENAI_EMBEDDING_API_KEY", API_KEY)
-    EMBED_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
-    EMBED_API_VERSION = os.getenv("AZURE_OPENAI_EMBEDDING_API_VERSION", API_VERSION).strip('"')
-    EMBED_ENDPOINT = os.getenv("AZURE_OPENAI_EMBEDDING_ENDPOINT", RAW_ENDPOINT)
-    EMBED_BASE = (
-        f"{urlsplit(EMBED_ENDPOINT).scheme}://{urlsplit(EMBED_ENDPOINT).netloc}"
-        if EMBED_ENDPOINT
-        else None
-    )
+    @cached_property
+    def EMBED_KEY(self):
+        return os.getenv("AZURE_OPENAI_EMBEDDING_API_KEY", self.API_KEY)
+
+    @cached_property
+    def EMBED_DEPLOYMENT(self):
+        return os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+
+    @cached_property
+    def EMBED_API_VERSION(self):
+        return os.getenv(
+            "AZURE_OPENAI_EMBEDDING_API_VERSION", self.API_VERSION
+        ).strip('"')
+
+    @cached_property
+    def EMBED_ENDPOINT(self):
+        return os.getenv("AZURE_OPENAI_EMBEDDING_ENDPOINT", self.RAW_ENDPOINT)
+
+    @cached_property
+    def EMBED_BASE(self):
+        self.validate()
+        return _base_url(self.EMBED_ENDPOINT)
 
     # --- Basic validation ---
-    required = [API_KEY, CHAT_DEPLOYMENT, RAW_ENDPOINT, EMBED_DEPLOYMENT]
-    if not all(required):
-        raise RuntimeError("Missing one or more required AZURE_OPENAI_* environment variables.")
+    def validate(self):
+        required = [
+            self.API_KEY,
+            self.CHAT_DEPLOYMENT,
+            self.RAW_ENDPOINT,
+            self.EMBED_DEPLOYMENT,
+        ]
+        if not all(required):
+            raise RuntimeError(
+                "Missing one or more required AZURE_OPENAI_* environment variables."
+            )
+
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
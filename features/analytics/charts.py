@@ -1,9 +1,12 @@
 import io
 from typing import Iterable
 
-import matplotlib.pyplot as plt
+import matplotlib
 import pandas as pd
 import streamlit as st
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
 
 
 def _store_chart(entry: dict) -> None:
@@ -13,8 +16,13 @@ def _store_chart(entry: dict) -> None:
 
 def draw_pie(labels: Iterable[str], values: Iterable[float], title: str = "Pie Chart") -> None:
     """Render a donut‑style pie chart inside Streamlit and persist it."""
-    fig, ax = plt.subplots(figsize=(6, 6))
-    colors = plt.cm.tab20.colors[: len(labels)]
+    # Drive the Agg canvas directly instead of going through pyplot: no
+    # backend negotiation per call and nothing accumulates in pyplot's
+    # global figure registry across Streamlit reruns.
+    fig = Figure(figsize=(6, 6))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    colors = matplotlib.colormaps["tab20"].colors[: len(labels)]
     explode = [0.05] * len(labels)
 
     wedges, *_ = ax.pie(
@@ -28,7 +36,7 @@ def draw_pie(labels: Iterable[str], values: Iterable[float], title: str = "Pie C
         wedgeprops={"linewidth": 1, "edgecolor": "white"},
     )
 
-    ax.add_artist(plt.Circle((0, 0), 0.5, color="white"))
+    ax.add_artist(Circle((0, 0), 0.5, color="white"))
     ax.legend(
         wedges,
         labels,
@@ -38,9 +46,14 @@ def draw_pie(labels: Iterable[str], values: Iterable[float], title: str = "Pie C
     )
     ax.set_aspect("equal")
 
+    # WebP is ~3-5x smaller than PNG for flat-colour charts, which matters
+    # because the bytes live in session_state for the rest of the session.
     buf = io.BytesIO()
-    fig.savefig(buf, format="png")
-    buf.seek(0)
+    try:
+        canvas.print_figure(buf, format="webp", dpi=90)
+    except Exception:  # Pillow without WebP support
+        buf = io.BytesIO()
+        canvas.print_png(buf)
 
     _store_chart({"type": "pie", "title": title, "image": buf.getvalue()})
 
@@ -48,9 +61,15 @@ def draw_pie(labels: Iterable[str], values: Iterable[float], title: str = "Pie C
     st.image(buf.getvalue())
 
 
-def draw_line_chart(dates: Iterable[str], values: Iterable[float], title: str = "Line Chart") -> None:
-    """Render a line chart inside Streamlit and persist it."""
-    df = pd.DataFrame({"value": list(values)}, index=pd.to_datetime(list(dates)))
+def draw_line_chart(pairs: Iterable[tuple[str, float]], title: str = "Line Chart") -> None:
+    """Render a line chart from ``(date, value)`` pairs inside Streamlit.
+
+    Takes the pair list as produced by ``get_stock_history`` directly, so
+    callers no longer need a ``zip(*series)`` transpose pass.
+    """
+    df = pd.DataFrame(list(pairs), columns=["Date", "value"])
+    df["Date"] = pd.to_datetime(df["Date"], cache=True)
+    df = df.set_index("Date")
     _store_chart({"type": "line", "title": title, "data": df})
     st.subheader(title)
     st.line_chart(df)
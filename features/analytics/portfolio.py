@@ -30,9 +30,13 @@ __all__ = [
 # --------------------------------------------------------------------------- #
 
 
-def _to_series(data: Iterable[float | int], name: str = "value") -> pd.Series:
-    """Convert *data* to a float Series (do **not** drop NA)."""
-    return pd.Series(list(data), dtype="float64", name=name)
+def _as_float_array(data: Iterable[float | int]) -> np.ndarray:
+    """Convert *data* to a float64 ndarray (do **not** drop NA)."""
+    if isinstance(data, np.ndarray):
+        return data.astype("float64", copy=False)
+    if isinstance(data, pd.Series):
+        return data.to_numpy(dtype="float64", copy=False)
+    return np.asarray(list(data), dtype="float64")
 
 
 def _ensure_returns(
@@ -40,18 +44,18 @@ def _ensure_returns(
     *,
     is_prices: bool,
     returns_are_percent: bool,
-) -> pd.Series:
-    """Return a **returns** Series (decimal) from *series* regardless of input."""
-    s = _to_series(series)
+) -> np.ndarray:
+    """Return a **returns** array (decimal) from *series* regardless of input."""
+    values = _as_float_array(series)
 
     if is_prices:
-        returns = s.pct_change()
+        returns = values[1:] / values[:-1] - 1.0
     else:
-        returns = s.copy()
+        returns = values
 
     if returns_are_percent:
         returns = returns / 100.0
-    return returns.dropna()
+    return returns[~np.isnan(returns)]
 
 
 # --------------------------------------------------------------------------- #
@@ -78,9 +82,9 @@ def max_drawdown(
         # Build a price curve from return series
         prices = np.cumprod(1.0 + prices)
 
-    peaks = np.maximum.accumulate(prices)
-    drawdowns = (prices - peaks) / peaks
-    return float(drawdowns.min())  # most negative value
+    # Fused price/running-peak ratio: one temporary instead of separate
+    # peaks and drawdowns arrays.
+    return float((prices / np.maximum.accumulate(prices)).min() - 1.0)
 
 
 # Simple wrapper so the tool schema can call this directly
@@ -117,32 +121,37 @@ def compute_portfolio_metrics(
     used.
     """
 
-    returns_series = _ensure_returns(
-        series,
+    values = _as_float_array(series)
+    returns = _ensure_returns(
+        values,
         is_prices=is_prices,
         returns_are_percent=bool(returns_are_percent),
     )
 
     if periods_per_year is None:
         if dates is not None:
-            ds = pd.to_datetime(list(dates), errors="coerce")
-            ds = ds.dropna()
-            if len(ds) > 1:
-                med_delta = ds.sort_values().diff().median()
-                if pd.notna(med_delta):
-                    days = med_delta / pd.Timedelta(days=1)
+            # Median spacing via numpy on datetime64 – no Series round trip.
+            try:
+                ds = pd.to_datetime(dates, errors="coerce").to_numpy()
+                ds = ds[~np.isnat(ds)]
+                if ds.size > 1:
+                    days = float(
+                        np.median(np.diff(np.sort(ds)) / np.timedelta64(1, "D"))
+                    )
                     if 350 <= days <= 370:
                         periods_per_year = 1
                     elif 27 <= days <= 31:
                         periods_per_year = 12
                     elif 0.5 <= days <= 1.5:
                         periods_per_year = 252
+            except (TypeError, ValueError):
+                pass
 
         if periods_per_year is None:
-            n = len(returns_series)
+            n = returns.size
             periods_per_year = 1 if n <= 12 else 12 if n <= 60 else 252
 
-    if returns_series.empty:
+    if returns.size == 0:
         return {
             "cumulative_return": math.nan,
             "annualized_return": math.nan,
@@ -150,18 +159,23 @@ def compute_portfolio_metrics(
             "max_drawdown": math.nan,
         }
 
-    cumulative_return = (1.0 + returns_series).prod() - 1.0
+    # Compound in log space: log1p + sum is a SIMD-friendly reduction and
+    # avoids the rounding drift of chaining N multiplications; errstate
+    # silences the -inf warning a -100% period return would raise.
+    n_periods = returns.size
+    with np.errstate(divide="ignore"):
+        total_log = float(np.log1p(returns).sum())
+    cumulative_return = math.expm1(total_log)
+    annualized_return = math.expm1(total_log * periods_per_year / n_periods)
 
-    n_periods = len(returns_series)
-    geometric_mean = (1.0 + cumulative_return) ** (1.0 / n_periods) - 1.0
-    annualized_return = (1.0 + geometric_mean) ** periods_per_year - 1.0
-
-    annualized_volatility = returns_series.std(ddof=0) * math.sqrt(periods_per_year)
+    annualized_volatility = float(returns.std(ddof=0)) * math.sqrt(periods_per_year)
 
+    # Reuse the float64 array materialised above instead of re-parsing the
+    # raw input a second time.
     if is_prices:
-        mdd = max_drawdown(series, is_prices=True)
+        mdd = max_drawdown(values, is_prices=True)
     else:
-        mdd = max_drawdown(returns_series, is_prices=False)
+        mdd = max_drawdown(returns, is_prices=False)
 
     return {
         "cumulative_return": cumulative_return,
@@ -184,50 +198,62 @@ def compute_portfolio_metrics_from_excel(
 
     By default the values are treated as **monthly returns in decimal form**.
     """
-    df = pd.read_excel(file, sheet_name=sheet)
+    # calamine + Arrow-backed columns skip Python-object boxing during the
+    # read; fall back to the default engine/backend when either is missing.
+    try:
+        df = pd.read_excel(
+            file, sheet_name=sheet, engine="calamine", dtype_backend="pyarrow"
+        )
+    except (ImportError, ValueError):
+        try:
+            file.seek(0)
+        except Exception:
+            pass
+        df = pd.read_excel(file, sheet_name=sheet)
     if df.shape[1] < 2:
         raise ValueError("Excel sheet must have at least two columns")
 
-    dates = pd.to_datetime(df.iloc[:, 0], errors="coerce")
-    values = pd.to_numeric(df.iloc[:, 1], errors="coerce")
-    mask = dates.notna() & values.notna()
-    dates = dates.loc[mask]
-    values = values.loc[mask]
+    dates = pd.to_datetime(df.iloc[:, 0], errors="coerce").to_numpy()
+    values = pd.to_numeric(df.iloc[:, 1], errors="coerce").to_numpy(dtype="float64")
+    mask = ~np.isnan(values) & ~np.isnat(dates)
 
     return compute_portfolio_metrics(
-        values.tolist(),
+        values[mask],
         is_prices=is_prices,
         periods_per_year=periods_per_year,
         risk_free_rate=risk_free_rate,
         returns_are_percent=returns_are_percent,
-        dates=dates.tolist(),
+        dates=dates[mask],
     )
 # --------------------------------------------------------------------------- #
 # Streamlit helper                                                            #
 # --------------------------------------------------------------------------- #
 
 
-def render_metrics_table(metrics: Mapping[str, float]) -> None:
-    """Pretty-print *metrics* as a two-column table in Streamlit."""
-    df = (
-        pd.Series(metrics)
-        .to_frame("value")
-        .round(4)
-        .rename_axis("metric")
-        .reset_index()
-    )
-
-    pct_cols = {
+_PCT_METRICS = frozenset(
+    {
         "cumulative_return",
         "annualized_return",
         "annualized_volatility",
         "max_drawdown",
     }
-    df.loc[df["metric"].isin(pct_cols), "value"] = df.loc[
-        df["metric"].isin(pct_cols), "value"
-    ].apply(lambda x: f"{x * 100:.2f}%" if pd.notna(x) else "–")
+)
+
+
+def render_metrics_table(metrics: Mapping[str, float]) -> None:
+    """Pretty-print *metrics* as a two-column table in Streamlit."""
+    df = pd.Series(metrics, name="value").round(4).rename_axis("metric").to_frame()
+
+    # Format the percentage rows in one vectorised pass instead of a
+    # per-cell Python lambda.
+    mask = df.index.isin(_PCT_METRICS)
+    vals = df.loc[mask, "value"].to_numpy(dtype="float64")
+    df["value"] = df["value"].astype(object)
+    df.loc[mask, "value"] = np.where(
+        np.isnan(vals), "–", np.char.add(np.char.mod("%.2f", vals * 100.0), "%")
+    )
 
-    st.table(df.set_index("metric"))
+    st.table(df)
 
 
 # --------------------------------------------------------------------------- #
@@ -241,15 +267,30 @@ def yearly_performance(
     *,
     returns_are_percent: bool | None = False,
 ) -> dict[int, float]:
-    """Aggregate period returns into calendar-year total returns."""
-    df = pd.DataFrame({"date": list(dates), "ret": list(returns)})
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date", "ret"])
+    """Aggregate period returns into calendar-year total returns.
+
+    Implemented as a sort + ``np.multiply.reduceat`` compounding pass over
+    run-length year segments instead of a pandas groupby, which avoids the
+    DataFrame construction and hash-grouping machinery per call.
+    """
+    ds = pd.to_datetime(list(dates), errors="coerce")
+    rets = np.asarray(pd.to_numeric(list(returns), errors="coerce"), dtype="float64")
+
+    valid = ds.notna() & ~np.isnan(rets)
+    years = ds[valid].year.to_numpy()
+    rets = rets[valid]
+    if years.size == 0:
+        return {}
 
     if bool(returns_are_percent):
-        df["ret"] = df["ret"] / 100.0
+        rets = rets / 100.0
+
+    order = np.argsort(years, kind="stable")
+    years = years[order]
+    rets = rets[order]
 
-    grouped = (1.0 + df["ret"]).groupby(df["date"].dt.year).prod() - 1.0
-    return grouped.to_dict()
+    edges = np.flatnonzero(np.r_[True, np.diff(years) != 0])
+    totals = np.multiply.reduceat(1.0 + rets, edges) - 1.0
+    return dict(zip(years[edges].tolist(), totals.tolist()))
 
 
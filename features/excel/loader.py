@@ -1,6 +1,26 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
 
+def _open_workbook(file) -> pd.ExcelFile:
+    """Open *file* with the Rust-backed calamine parser when available.
+
+    calamine is typically several times faster than openpyxl on multi-sheet
+    workbooks; environments without python-calamine (or with an older
+    pandas) silently fall back to the default engine.
+    """
+    try:
+        return pd.ExcelFile(file, engine="calamine")
+    except (ImportError, ValueError):
+        try:
+            file.seek(0)
+        except Exception:
+            pass
+        return pd.ExcelFile(file)
+
+
 def load_excel(file):
     """Load an uploaded Excel file and return a dict of DataFrames keyed by sheet name.
 
@@ -20,40 +40,111 @@ def load_excel(file):
     except Exception:
         pass
 
-    xls = pd.ExcelFile(file)
-    result: dict[str, pd.DataFrame] = {}
-    for sheet in xls.sheet_names:
-        df = xls.parse(sheet)
+    data = file.read()
+    xls = _open_workbook(io.BytesIO(data))
+    names = xls.sheet_names
+
+    if getattr(xls, "engine", None) == "calamine":
+        # One fused Rust-level pass over the whole workbook beats opening a
+        # handle per sheet; threading only pays off on the openpyxl fallback.
+        sheets = xls.parse(sheet_name=None)
+        return {name: _postprocess_sheet(df) for name, df in sheets.items()}
+
+    if len(names) > 1:
+        # ExcelFile handles are not thread-safe, so each worker opens its
+        # own view over the shared bytes. Zip inflation and XML parsing
+        # release the GIL, so multi-sheet books parse near-linearly.
+        def _parse(sheet: str) -> pd.DataFrame:
+            return _postprocess_sheet(_open_workbook(io.BytesIO(data)).parse(sheet))
+
+        with ThreadPoolExecutor(max_workers=min(8, len(names))) as ex:
+            return dict(zip(names, ex.map(_parse, names)))
+
+    return {sheet: _postprocess_sheet(xls.parse(sheet)) for sheet in names}
+
+
+def _postprocess_sheet(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalise one parsed sheet: epoch → dates, object columns → str."""
+    # Explicit UNIX timestamp columns
+    unix_cols = [
+        c for c in df.columns if "unix" in str(c).lower() and "ts" in str(c).lower()
+    ]
+    for col in unix_cols:
+        df[col] = pd.to_datetime(df[col], unit="s", errors="coerce")
+
+    # Heuristic detection of epoch numbers in seconds or milliseconds: grab
+    # the first non-null value of every numeric column in one bfill pass
+    # instead of dropna()/iloc[0] per column.
+    num = df.select_dtypes(include="number")
+    if unix_cols:
+        num = num.drop(columns=unix_cols, errors="ignore")
+    if not num.empty:
+        first_vals = num.bfill().iloc[0]
+        for col in first_vals.index[first_vals > 1e12]:  # likely in milliseconds
+            df[col] = pd.to_datetime(df[col], unit="ms", errors="coerce")
+        for col in first_vals.index[(first_vals > 1e9) & (first_vals <= 1e12)]:
+            df[col] = pd.to_datetime(df[col], unit="s", errors="coerce")
+
+    # Ensure object columns are cast to plain strings for Arrow
+    obj_cols = df.select_dtypes(include="object").columns
+    for obj in obj_cols:
+        df[obj] = df[obj].astype(str)
+
+    return df
+
+
+def format_dates(df: pd.DataFrame, fmt: str = "%d-%b-%Y") -> pd.DataFrame:
+    """Return a display copy of *df* with datetime columns formatted as *fmt*.
+
+    Loading keeps datetime columns as datetime64 (8 bytes/row, no Python
+    string objects); call this only when handing a frame to Streamlit.
+    """
+    dt_cols = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    if not dt_cols:
+        return df
+    out = df.copy(deep=False)
+    for col in dt_cols:
+        out[col] = df[col].dt.strftime(fmt)
+    return out
 
-        # Convert Unix timestamp columns or columns with epoch-like values
-        for col in df.columns:
-            name = str(col).lower()
-            series = df[col]
 
-            if "unix" in name and "ts" in name:
-                # Explicit UNIX timestamp column
-                df[col] = pd.to_datetime(series, unit="s", errors="coerce")
-            else:
-                # Heuristic detection of epoch numbers in seconds or milliseconds
-                s = series.dropna()
-                if not s.empty and pd.api.types.is_numeric_dtype(s):
-                    sample = s.iloc[0]
-                    if sample > 1e12:  # likely in milliseconds
-                        df[col] = pd.to_datetime(series, unit="ms", errors="coerce")
-                    elif sample > 1e9:
-                        df[col] = pd.to_datetime(series, unit="s", errors="coerce")
+# Strips thousands separators and percent signs in one translate pass.
+_NUMERIC_TRANS = str.maketrans("", "", ",%")
+
 
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[col] = df[col].dt.strftime("%d-%b-%Y")
+def _clean_numeric(col: pd.Series) -> pd.Series:
+    """Return numeric values from *col* handling common symbols."""
+    # Already-numeric columns (the common case) cannot contain the symbols
+    # being stripped, so skip the string round-trip entirely.
+    if pd.api.types.is_numeric_dtype(col):
+        return col.dropna()
+    cleaned = [v.translate(_NUMERIC_TRANS) if isinstance(v, str) else v for v in col]
+    return pd.to_numeric(pd.Series(cleaned, index=col.index), errors="coerce").dropna()
 
-        # Ensure object columns are cast to plain strings for Arrow
-        obj_cols = df.select_dtypes(include="object").columns
-        for obj in obj_cols:
-            df[obj] = df[obj].astype(str)
 
-        result[sheet] = df
-    
-    return result
+def _fund_column_maps(df: pd.DataFrame) -> tuple[dict[str, int], dict[str, int]]:
+    """Return lower-cased name → column-position maps for *df*.
+
+    First element resolves column headers, second the first-row values.
+    Cached in ``df.attrs`` so the O(columns) scan runs once per DataFrame
+    instead of on every fund lookup.
+    """
+    maps = df.attrs.get("_fund_col_maps")
+    if maps is None:
+        header_map: dict[str, int] = {}
+        for i, c in enumerate(df.columns):
+            header_map.setdefault(str(c).strip().lower(), i)
+        first_row_map: dict[str, int] = {}
+        if not df.empty:
+            row0 = df.iloc[0]
+            # A fully numeric first row cannot hold fund names – skip the
+            # O(columns) string normalisation for it entirely.
+            if any(isinstance(v, str) for v in row0):
+                for i, v in enumerate(row0.astype(str)):
+                    first_row_map.setdefault(v.strip().lower(), i)
+        maps = (header_map, first_row_map)
+        df.attrs["_fund_col_maps"] = maps
+    return maps
 
 
 def get_fund_series(excel_data: dict[str, pd.DataFrame], sheet: str, fund_name: str) -> list[float] | None:
@@ -67,30 +158,17 @@ def get_fund_series(excel_data: dict[str, pd.DataFrame], sheet: str, fund_name:
     if df is None or df.empty:
         return None
 
-    def _clean_numeric(col: pd.Series) -> pd.Series:
-        """Return numeric values from *col* handling common symbols."""
-        cleaned = (
-            col.astype(str)
-            .str.replace(",", "", regex=False)
-            .str.replace("%", "", regex=False)
-        )
-        return pd.to_numeric(cleaned, errors="coerce").dropna()
-
+    header_map, first_row_map = _fund_column_maps(df)
     fund_lower = fund_name.strip().lower()
 
     # 1) match against column labels
-    cols_lower = [str(c).strip().lower() for c in df.columns]
-    if fund_lower in cols_lower:
-        col = df.iloc[:, cols_lower.index(fund_lower)]
-        series = _clean_numeric(col)
+    if fund_lower in header_map:
+        series = _clean_numeric(df.iloc[:, header_map[fund_lower]])
         return series.tolist()
 
     # 2) match against first-row values
-    first_row = df.iloc[0].astype(str).str.strip().str.lower()
-    matches = first_row[first_row == fund_lower]
-    if not matches.empty:
-        idx = matches.index[0]
-        col = _clean_numeric(df.loc[1:, idx])
+    if fund_lower in first_row_map:
+        col = _clean_numeric(df.iloc[1:, first_row_map[fund_lower]])
         return col.tolist()
 
     return None
@@ -112,27 +190,27 @@ def get_fund_month_value(
     if df is None or df.empty:
         return None
 
+    header_map, first_row_map = _fund_column_maps(df)
     fund_lower = fund_name.strip().lower()
 
     # Find the column for the fund
-    col_idx = None
-    cols_lower = [str(c).strip().lower() for c in df.columns]
     df_values = df
-    if fund_lower in cols_lower:
-        col_idx = cols_lower.index(fund_lower)
+    if fund_lower in header_map:
+        col_idx = header_map[fund_lower]
+    elif fund_lower in first_row_map:
+        col_idx = first_row_map[fund_lower]
+        df_values = df.iloc[1:]
     else:
-        first_row = df.iloc[0].astype(str).str.strip().str.lower()
-        matches = first_row[first_row == fund_lower]
-        if not matches.empty:
-            col_idx = matches.index[0]
-            df_values = df.iloc[1:]
-
-    if col_idx is None:
         return None
 
-    # Find the row for the month
+    # Find the row for the month; the first column is usually datetime64
+    # straight from load_excel, so re-parsing is only needed for strings.
     target = pd.to_datetime(month, errors="coerce")
-    date_col = pd.to_datetime(df_values.iloc[:, 0], errors="coerce")
+    raw_dates = df_values.iloc[:, 0]
+    if pd.api.types.is_datetime64_any_dtype(raw_dates):
+        date_col = raw_dates
+    else:
+        date_col = pd.to_datetime(raw_dates, errors="coerce")
 
     if pd.isna(target):
         mask = (
@@ -154,6 +232,41 @@ def get_fund_month_value(
     return float(value)
 
 
+# Ranking output keys and their zero-based column positions
+# (R, V, Y, AB, AM, AO, AQ, AS).
+_RANK_KEYS = (
+    "rank_total_pts",
+    "rank_1yr",
+    "rank_3yr",
+    "rank_5yr",
+    "rank_max_dd",
+    "rank_sharpe",
+    "rank_sortino",
+    "rank_treynor",
+)
+_RANK_COLS = (17, 21, 24, 27, 38, 40, 42, 44)
+
+
+def _ticker_col_lower(df: pd.DataFrame) -> pd.Series:
+    """Return column B lower-cased, cached in ``df.attrs`` per DataFrame."""
+    tickers = df.attrs.get("_tickers_lower")
+    if tickers is None:
+        tickers = df.iloc[:, 1].astype(str).str.strip().str.lower()
+        df.attrs["_tickers_lower"] = tickers
+    return tickers
+
+
+def _ticker_index(df: pd.DataFrame) -> dict[str, int]:
+    """Map lowered ticker → first row position, built once per DataFrame."""
+    idx = df.attrs.get("_ticker_index")
+    if idx is None:
+        idx = {}
+        for i, t in enumerate(_ticker_col_lower(df).tolist()):
+            idx.setdefault(t, i)
+        df.attrs["_ticker_index"] = idx
+    return idx
+
+
 def get_fund_rankings(
     excel_data: dict[str, pd.DataFrame],
     ticker: str,
@@ -181,34 +294,29 @@ def get_fund_rankings(
     """
 
     def _search(df: pd.DataFrame) -> dict[str, float | int] | None:
-        tickers = df.iloc[:, 1].astype(str).str.strip().str.lower()
-        mask = tickers == ticker.strip().lower()
-        if not mask.any():
+        pos = _ticker_index(df).get(ticker.strip().lower())
+        if pos is None:
             return None
-        row = df.loc[mask].iloc[0]
-
-        def _get(col_idx: int) -> float | int | None:
-            if col_idx >= len(row):
-                return None
-            val = row.iloc[col_idx]
-            if pd.isna(val):
-                return None
-            try:
-                return float(str(val).replace("%", "").replace(",", ""))
-            except Exception:
-                return None
-
-        col_map = {
-            "rank_total_pts": 17,  # R
-            "rank_1yr": 21,       # V
-            "rank_3yr": 24,       # Y
-            "rank_5yr": 27,       # AB
-            "rank_max_dd": 38,    # AM
-            "rank_sharpe": 40,    # AO
-            "rank_sortino": 42,   # AQ
-            "rank_treynor": 44,   # AS
-        }
-        return {k: _get(idx) for k, idx in col_map.items()}
+        row = df.iloc[pos]
+
+        # Gather all rank cells in one vectorised pass instead of eight
+        # scalar iloc/parse round-trips.
+        present = [c for c in _RANK_COLS if c < len(row)]
+        nums = pd.to_numeric(
+            row.iloc[present].astype(str).str.translate(_NUMERIC_TRANS),
+            errors="coerce",
+        ).to_numpy(dtype="float64")
+
+        result: dict[str, float | int | None] = {}
+        i = 0
+        for key, col_idx in zip(_RANK_KEYS, _RANK_COLS):
+            if col_idx < len(row):
+                v = nums[i]
+                i += 1
+                result[key] = None if pd.isna(v) else float(v)
+            else:
+                result[key] = None
+        return result
 
     results: dict[str, dict[str, float | int]] = {}
 
@@ -8,6 +8,8 @@ v2.8.4
 from __future__ import annotations
 
 import json
+import logging
+from functools import lru_cache
 from typing import Sequence, Any
 
 from openai import AzureOpenAI, OpenAIError
@@ -16,14 +18,24 @@ from config.settings import settings
 from .prompts import build_system_prompt
 from .tools import TOOLS
 
+logger = logging.getLogger(__name__)
+
 # --------------------------------------------------------------------------- #
-# Azure OpenAI client (singleton)                                             #
+# Azure OpenAI client (lazy singleton)                                        #
 # --------------------------------------------------------------------------- #
-client = AzureOpenAI(
-    api_key=settings.API_KEY,
-    api_version=settings.API_VERSION,
-    azure_endpoint=settings.BASE_ENDPOINT,
-)
+@lru_cache(maxsize=1)
+def get_client() -> AzureOpenAI:
+    """Build the Azure client on first use and reuse it afterwards.
+
+    Constructing the client at import time added httpx/transport setup to
+    every cold start of any module that merely imports ``ask_llm``.
+    """
+    return AzureOpenAI(
+        api_key=settings.API_KEY,
+        api_version=settings.API_VERSION,
+        azure_endpoint=settings.BASE_ENDPOINT,
+        max_retries=2,  # retry slow/failed calls instead of hanging the turn
+    )
 
 # --------------------------------------------------------------------------- #
 # Helpers                                                                     #
@@ -65,37 +77,41 @@ def ask_llm(
     *,
     top_k: int = 6,
     enable_tools: bool = True,
+    request_timeout: float = 45.0,
+    stream: bool = False,
 ):
-    """Call Azure ChatGPT, adding RAG context + tool list."""
+    """Call Azure ChatGPT, adding RAG context + tool list.
+
+    *request_timeout* bounds each HTTP attempt; together with the client's
+    ``max_retries`` this turns a hung Azure call into a quick retry instead
+    of blocking the Streamlit script for the provider's full tail latency.
+
+    With ``stream=True`` (tool-free calls only) the raw chunk iterator is
+    returned so the caller can render deltas as they arrive.
+    """
     sys_prompt = build_system_prompt()
 
     # Inject PDF-similarity context
     if vectorstore and user_input.strip():
         ctx_docs = vectorstore.similarity_search(user_input, k=top_k)
+        # Stable ordering by chunk hash: identical retrieval sets yield a
+        # byte-identical prompt, so the provider prompt cache can hit.
+        ctx_docs.sort(key=lambda d: d.metadata.get("chunk_sha", ""))
         ctx = _format_ctx_docs(ctx_docs)
         if ctx:
             sys_prompt = build_system_prompt(ctx)
 
-    # Tell the model explicitly when to call the Excel tools
-    sys_prompt += (
-        "\n\nIf the user requests data that lives in the uploaded Excel "
-        "workbook, call the `get_excel_data`, `get_fund_rankings`, "
-        "`list_excel_sheets`, `get_fund_series`, or `get_fund_month_value` functions as appropriate. "
-        "`get_fund_rankings` returns a dictionary keyed by sheet name and searches all sheets if no sheet name is given. "
-        "Do not assume a sheet called 'Main Funds'. If you are unsure which sheet contains the data, omit the sheet parameter so the function searches the entire workbook. "
-        "If you receive an error about sheet names, immediately retry with one of the "
-        "available sheet names mentioned in the error message. Do not give up after "
-        "the first error - always attempt to use the correct sheet names."
-    )
-
     messages_openai = [{"role": "system", "content": sys_prompt}] + messages
 
-    # ---------------- DEBUG payload summary -------------------------------- #
-    tool_names = [t["function"]["name"] for t in TOOLS]
-    print("TOOLS SENT TO OPENAI :", tool_names)
-    print("MESSAGE COUNT        :", len(messages_openai))
-    print("JSON BYTES (approx)  :", _json_bytes_safe(messages_openai))
-    # ----------------------------------------------------------------------- #
+    # Payload summary – isEnabledFor gates the (expensive) JSON size probe
+    # so the hot path pays nothing when debug logging is off.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "tools=%s messages=%d json_bytes=%d",
+            [t["function"]["name"] for t in TOOLS],
+            len(messages_openai),
+            _json_bytes_safe(messages_openai),
+        )
     try:
         # return client.chat.completions.create(
         #     model=settings.CHAT_DEPLOYMENT,
@@ -104,25 +120,28 @@ def ask_llm(
         #     tool_choice="auto",
         # )
         if enable_tools:
-            return client.chat.completions.create(
+            return get_client().chat.completions.create(
                 model=settings.CHAT_DEPLOYMENT,
                 messages=messages_openai,
                 tools=TOOLS,
                 tool_choice="auto",
+                timeout=request_timeout,
             )
         else:
-            return client.chat.completions.create(
+            return get_client().chat.completions.create(
                 model=settings.CHAT_DEPLOYMENT,
                 messages=messages_openai,
+                timeout=request_timeout,
+                stream=stream,
             )
         
     except OpenAIError as err:
         # Dump HTTP error details for diagnosis
         resp = getattr(err, "response", None)
         if resp is not None:
-            print("AZURE API STATUS:", resp.status_code)
             try:
-                print("AZURE API BODY   :", resp.json())
+                body = resp.json()
             except Exception:
-                print("AZURE API BODY (raw):", resp.text)
-        raise 
+                body = resp.text
+            logger.error("Azure API error %s: %s", resp.status_code, body)
+        raise
@@ -126,11 +126,28 @@ Begin analysis upon receiving the statement content and user query.
 """
 
 
+# Routing hint for the Excel tools – part of the stable prompt prefix.
+EXCEL_TOOLS_HINT = (
+    "\n\nIf the user requests data that lives in the uploaded Excel "
+    "workbook, call the `get_excel_data`, `get_fund_rankings`, "
+    "`list_excel_sheets`, `get_fund_series`, or `get_fund_month_value` functions as appropriate. "
+    "`get_fund_rankings` returns a dictionary keyed by sheet name and searches all sheets if no sheet name is given. "
+    "Do not assume a sheet called 'Main Funds'. If you are unsure which sheet contains the data, omit the sheet parameter so the function searches the entire workbook. "
+    "If you receive an error about sheet names, immediately retry with one of the "
+    "available sheet names mentioned in the error message. Do not give up after "
+    "the first error - always attempt to use the correct sheet names."
+)
+
+# Everything before the retrieved context is byte-identical across turns so
+# the provider-side prompt cache can reuse the prefill.
+_PREFIX = SYSTEM_PROMPT_CORE + EXCEL_TOOLS_HINT
+
+
 def build_system_prompt(extra_context: str = "") -> str:
     """Return the full system prompt, optionally appending retrieved PDF context."""
     if extra_context:
-        # Using f-string for clarity and adding a double newline before context
-        # for better separation, which can sometimes help LLM parsing.
-        return f"{SYSTEM_PROMPT_CORE}\n\nContext from PDFs:\n{extra_context}"
-    return SYSTEM_PROMPT_CORE
+        # Context always goes last: a per-query suffix keeps the shared
+        # prefix stable for provider-side KV-cache reuse.
+        return f"{_PREFIX}\n\nContext from PDFs:\n{extra_context}"
+    return _PREFIX
 
@@ -0,0 +1,116 @@
+# features/llm/semcache.py
+"""In-session semantic cache for chat completions.
+
+Analysts often re-ask near-duplicate questions ("what's my max
+drawdown?" vs "compute the maximum draw-down"); each phrasing otherwise
+pays a full Azure round-trip. The cache embeds the query with the same
+Azure deployment used for PDF indexing, keeps (vector, response) pairs
+for the session and serves a prior response when cosine similarity
+exceeds a threshold.
+
+Responses that triggered tool calls must never be cached – their
+outputs depend on live data (quotes, uploaded workbooks, …).
+"""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import numpy as np
+
+from config.settings import settings
+
+SIM_THRESHOLD = 0.92
+DEFAULT_TTL = 3600.0  # seconds
+
+
+def _get_embedder():
+    """Return the same embeddings client configuration the indexer uses."""
+    # Deferred so importing this module (appp.py does so at top level)
+    # never pays the LangChain import chain; it loads on first embed.
+    from langchain_openai import AzureOpenAIEmbeddings
+
+    return AzureOpenAIEmbeddings(
+        api_key=settings.EMBED_KEY,
+        api_version=settings.EMBED_API_VERSION,
+        azure_endpoint=settings.EMBED_BASE,
+        deployment=settings.EMBED_DEPLOYMENT,
+    )
+
+
+class SemanticCache:
+    """Cosine-similarity lookup over previously answered queries."""
+
+    def __init__(
+        self,
+        *,
+        threshold: float = SIM_THRESHOLD,
+        ttl: float = DEFAULT_TTL,
+    ) -> None:
+        self.threshold = threshold
+        self.ttl = ttl
+        self._vectors: np.ndarray | None = None  # (n, dim) L2-normalised
+        self._entries: list[tuple[float, Any]] = []  # (stored_at, response)
+        self._embedder: Any = None  # AzureOpenAIEmbeddings, built lazily
+
+    # ------------------------------------------------------------------ #
+    # Internals                                                          #
+    # ------------------------------------------------------------------ #
+    def _embed(self, text: str) -> np.ndarray:
+        if self._embedder is None:
+            self._embedder = _get_embedder()
+        vec = np.asarray(self._embedder.embed_query(text), dtype="float64")
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _evict_expired(self) -> None:
+        """Drop rows past their TTL so stale entries never shadow fresh ones."""
+        if self._vectors is None:
+            return
+        cutoff = time.monotonic() - self.ttl
+        keep = [i for i, (stored_at, _) in enumerate(self._entries) if stored_at > cutoff]
+        if len(keep) == len(self._entries):
+            return
+        if not keep:
+            self._vectors = None
+            self._entries = []
+        else:
+            self._vectors = self._vectors[keep]
+            self._entries = [self._entries[i] for i in keep]
+
+    # ------------------------------------------------------------------ #
+    # Public API                                                         #
+    # ------------------------------------------------------------------ #
+    def lookup(self, query: str):
+        """Return a cached response for *query* or ``None`` on miss."""
+        if self._vectors is None or not query.strip():
+            return None
+        self._evict_expired()
+        if self._vectors is None:
+            return None
+        vec = self._embed(query)
+        scores = self._vectors @ vec
+        hits = np.flatnonzero(scores >= self.threshold)
+        if hits.size == 0:
+            return None
+        # All remaining rows are fresh; prefer the newest so re-stored
+        # duplicates of a question shadow their older copies.
+        best = max(hits, key=lambda i: self._entries[i][0])
+        return self._entries[best][1]
+
+    def store(self, query: str, response: Any) -> None:
+        """Remember *response* for *query* (call only for tool-free replies)."""
+        if not query.strip():
+            return
+        self._evict_expired()
+        vec = self._embed(query)
+        if self._vectors is None:
+            self._vectors = vec[np.newaxis, :]
+        else:
+            self._vectors = np.vstack([self._vectors, vec])
+        self._entries.append((time.monotonic(), response))
+
+    def clear(self) -> None:
+        """Drop all cached answers (e.g. after the PDF index changes)."""
+        self._vectors = None
+        self._entries.clear()
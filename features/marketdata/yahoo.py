@@ -14,6 +14,10 @@ import numpy as np
 import pandas as pd
 import yfinance as yf
 
+# Connection reuse across quote/history calls comes from yfinance itself:
+# since 0.2.50 it maintains a single shared curl_cffi session internally,
+# and it rejects externally supplied requests.Session objects.
+
 
 def _clean_ticker(ticker: str) -> str:
     """Return the first whitespace-separated token in uppercase."""
@@ -127,6 +131,61 @@ def get_stock_history(
     ]
 
 
+_BATCH_SIZE = 20  # Yahoo accepts ~20 comma-joined symbols per request
+
+
+def get_stock_histories(
+    tickers: list[str],
+    period: str = "1y",
+    interval: Interval = "1d",
+    col: str = "Adj Close",
+) -> dict[str, list[tuple[str, float]]]:
+    """
+    Fetch history for several tickers with one Yahoo request per batch of
+    20 symbols instead of one request per symbol. Returns a mapping of the
+    original ticker strings to the same [(date, price), …] shape as
+    :func:`get_stock_history`; symbols the batch could not resolve fall
+    back to the single-ticker path.
+    """
+    out: dict[str, list[tuple[str, float]]] = {}
+    cleaned = [(t, _clean_ticker(t)) for t in tickers]
+
+    for start in range(0, len(cleaned), _BATCH_SIZE):
+        batch = cleaned[start : start + _BATCH_SIZE]
+        symbols = [sym for _, sym in batch]
+        try:
+            df = yf.download(
+                symbols,
+                period=period,
+                interval=interval,
+                auto_adjust=False,
+                progress=False,
+                group_by="ticker",
+            )
+        except Exception:
+            df = pd.DataFrame()
+
+        for orig, sym in batch:
+            s = pd.Series(dtype="float64")
+            try:
+                sub = df[sym] if isinstance(df.columns, pd.MultiIndex) else df
+                s = (sub[col] if col in sub else sub["Close"]).dropna()
+            except Exception:
+                pass
+
+            if len(s) > 1:
+                s.index = pd.to_datetime(s.index, errors="coerce")
+                out[orig] = [
+                    (idx.strftime("%Y-%m-%d"), float(val)) for idx, val in s.items()
+                ]
+            else:
+                # per-symbol fallback keeps the single-ticker retry logic
+                out[orig] = get_stock_history(
+                    orig, period=period, interval=interval, col=col
+                )
+    return out
+
+
 def get_stock_quote(ticker: str) -> Dict:
     """
     Return a snapshot dict with latest price & key ratios.
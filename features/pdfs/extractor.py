@@ -19,6 +19,11 @@ from typing import BinaryIO, Sequence
 import PyPDF2
 import warnings
 
+try:
+    import fitz  # PyMuPDF – an order of magnitude faster than PyPDF2
+except ImportError:  # pragma: no cover – optional dependency
+    fitz = None
+
 warnings.filterwarnings("ignore", category=UserWarning, module="PyPDF2")
 
 logger = logging.getLogger(__name__)
@@ -56,14 +61,34 @@ def _page_text(reader: PyPDF2.PdfReader, page_index: int) -> str:
 # Public API                                                                  #
 # --------------------------------------------------------------------------- #
 
-def extract_text_from_pdf(file: BinaryIO | str | Path) -> Sequence[str]:  # noqa: D401
-    """Return *page‑level* texts using **PyPDF2** only.
+def _extract_with_fitz(data: bytes) -> list[str]:
+    """Page-level texts via PyMuPDF's streaming parser."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [page.get_text("text") or "" for page in doc]
+
 
-    The function accepts either a path‑string/``Path`` or an already‑open
-    binary buffer (e.g. :class:`io.BytesIO`). When the same buffer is
-    reused across consecutive calls, we rewind it for you.
+def extract_text_from_pdf(file: BinaryIO | str | Path) -> Sequence[str]:  # noqa: D401
+    """Return *page‑level* texts, preferring **PyMuPDF** over PyPDF2.
+
+    PyMuPDF parses lazily and extracts roughly an order of magnitude
+    faster; when it is not installed (or fails on a malformed file) we
+    fall back to the original PyPDF2 path. The function accepts either a
+    path‑string/``Path`` or an already‑open binary buffer (e.g.
+    :class:`io.BytesIO`). When the same buffer is reused across
+    consecutive calls, we rewind it for you.
     """
 
+    if fitz is not None:
+        try:
+            if isinstance(file, (str, Path)):
+                data = Path(file).read_bytes()
+            else:
+                _ensure_seek_start(file)
+                data = file.read()
+            return _extract_with_fitz(data)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("PyMuPDF failed (%s) – falling back to PyPDF2.", exc)
+
     # Prepare a reader – deal with both path and live buffer cases.
 
     if isinstance(file, (str, Path)):
@@ -3,6 +3,7 @@
 # --------------------------------------------------------------------------- #
 from __future__ import annotations
 
+import hashlib
 import logging
 from pathlib import Path
 from typing import BinaryIO, Iterable, Tuple
@@ -22,6 +23,10 @@ from .splitter import (
 
 logger = logging.getLogger(__name__)
 
+# Default on-disk home for the FAISS store – embedding PDFs is the app's
+# most expensive operation, so a restart should not throw the result away.
+VECTORSTORE_DIR = Path(".cache/vectorstore")
+
 
 # --------------------------------------------------------------------------- #
 # Helpers                                                                     #
@@ -34,6 +39,9 @@ def _get_embedder() -> AzureOpenAIEmbeddings:
         api_version=settings.EMBED_API_VERSION,
         azure_endpoint=settings.EMBED_BASE,
         deployment=settings.EMBED_DEPLOYMENT,
+        # One HTTP request per 256 chunks – amortises the per-call Azure
+        # latency while staying well inside the per-request token cap.
+        chunk_size=256,
     )
 
 
@@ -45,10 +53,49 @@ def _known_hashes(vs: FAISS) -> set[str]:
     }
 
 
+def _chunk_key(text: str) -> str:
+    """Truncated SHA-256 of the normalised chunk text."""
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()[:16]
+
+
+def _known_chunk_keys(vs: FAISS) -> set[str]:
+    """Harvest chunk-content keys already stored in *vs* (private FAISS API)."""
+    return {
+        meta.metadata.get("chunk_sha", "")
+        for meta in vs.docstore._dict.values()  # type: ignore[attr-defined]
+    }
+
+
 # --------------------------------------------------------------------------- #
 # Public API                                                                  #
 # --------------------------------------------------------------------------- #
 
+def save_vectorstore(vs: FAISS, path: str | Path = VECTORSTORE_DIR) -> None:
+    """Persist *vs* to *path* so warm restarts skip re-embedding."""
+    try:
+        Path(path).mkdir(parents=True, exist_ok=True)
+        vs.save_local(str(path))
+    except Exception:  # noqa: BLE001 – persistence is best-effort
+        logger.warning("Could not persist vectorstore to %s", path, exc_info=True)
+
+
+def load_vectorstore(path: str | Path = VECTORSTORE_DIR) -> FAISS | None:
+    """Load a previously persisted store, or ``None`` when absent/corrupt."""
+    p = Path(path)
+    if not (p / "index.faiss").exists():
+        return None
+    try:
+        return FAISS.load_local(
+            str(p),
+            _get_embedder(),
+            # Our own pickle from save_vectorstore, not untrusted input.
+            allow_dangerous_deserialization=True,
+        )
+    except Exception:  # noqa: BLE001
+        logger.warning("Could not load persisted vectorstore from %s", p, exc_info=True)
+        return None
+
+
 def index_pdfs(  # noqa: D401
     files: Iterable[BinaryIO],
     *,
@@ -66,6 +113,7 @@ def index_pdfs(  # noqa: D401
     # 1. Figure out which hashes we already know so we can skip duplicates   #
     # --------------------------------------------------------------------- #
     known_hashes: set[str] = _known_hashes(existing_vs) if existing_vs else set()
+    known_chunks: set[str] = _known_chunk_keys(existing_vs) if existing_vs else set()
 
     # --------------------------------------------------------------------- #
     # 2. Extract & chunk any genuinely new PDFs                              #
@@ -95,17 +143,26 @@ def index_pdfs(  # noqa: D401
                 chunk_size=chunk_size,
                 chunk_overlap=chunk_overlap,
             ):
-                if chunk.strip():
-                    new_docs.append(
-                        Document(
-                            page_content=chunk,
-                            metadata={
-                                "source": fname,
-                                "page": page_num,
-                                "sha256": sha256,
-                            },
-                        )
+                if not chunk.strip():
+                    continue
+                # Skip chunks whose content is already indexed (repeated
+                # headers/footers, overlapping re-uploads) so only genuinely
+                # new text pays the embedding cost.
+                key = _chunk_key(chunk)
+                if key in known_chunks:
+                    continue
+                known_chunks.add(key)
+                new_docs.append(
+                    Document(
+                        page_content=chunk,
+                        metadata={
+                            "source": fname,
+                            "page": page_num,
+                            "sha256": sha256,
+                            "chunk_sha": key,
+                        },
                     )
+                )
 
     # --------------------------------------------------------------------- #
     # 3. Nothing new? Just return what we started with                       #
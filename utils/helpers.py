@@ -2,9 +2,23 @@ import hashlib
 
 
 def file_hash(file_obj, chunk_size: int = 8192) -> str:
-    """Return SHA‑256 hash for a file‑like object; resets pointer to start."""
+    """Return SHA‑256 hash for a file‑like object; resets pointer to start.
+
+    The digest is cached on the object itself, so hashing the same upload
+    again (e.g. on a Streamlit rerun) skips the re-read and SHA pass.
+    """
+    cached = getattr(file_obj, "_ladp_sha256", None)
+    if cached is not None:
+        return cached
+
     hasher = hashlib.sha256()
     while chunk := file_obj.read(chunk_size):
         hasher.update(chunk)
     file_obj.seek(0)
-    return hasher.hexdigest()
\ No newline at end of file
+
+    digest = hasher.hexdigest()
+    try:
+        file_obj._ladp_sha256 = digest
+    except Exception:
+        pass  # objects with __slots__ just stay uncached
+    return digest